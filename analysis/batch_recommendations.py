@@ -0,0 +1,251 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+from analysis.recommendations import (
+    FILTER_TIERS,
+    NO_PAIN_QUERIES,
+    get_filter_index,
+    get_scoring_arrays,
+    recommendations_payload,
+    run_goal_mask,
+    top_trainers,
+)
+from analysis.schema import get_schema
+from config.settings import BATCH_RECOMMENDATION_CHUNK_CELLS
+
+_TIER_FLAGS = np.array([flags for _, flags in FILTER_TIERS])
+
+
+# A review's flags as one code: weight match (1) + run goal (2) + pain penalty (4) + not selected (8)
+_NOT_SELECTED = 8
+_CODES = 16
+
+
+def _build_batch_arrays(arrays):
+    """Per-snapshot tables that turn batch scoring into lookups and per-trainer bincounts"""
+    n_rows = len(arrays["trainer_codes"])
+    # Match percentage of every review for every bonus code, with the same arithmetic as the single-request
+    # engine; NaN (unrated reviews) counts as 0 here and is left out of the per-trainer counts below
+    base_score = (arrays["comfort"] + arrays["cushioning"] + arrays["responsiveness"]) / 3.0
+    match_table = np.zeros((_CODES, n_rows), dtype=np.float64)
+    for code in range(_NOT_SELECTED):
+        weight_bonus, goal_bonus, pain_penalty = (code & 1) * 2, (code >> 1 & 1) * 3, (code >> 2 & 1) * 3
+        match_score = np.clip(base_score + weight_bonus + goal_bonus - pain_penalty, 0, None)
+        match_table[code] = np.nan_to_num(np.round((match_score / 15.0) * 100, 0), nan=0.0)
+
+    score_ok = ~np.isnan(arrays["score"])
+    # Stored review-major, so cell (review, code) is at review * 16 + code
+    return {
+        "match_table": match_table.T.ravel(),
+        "score_ok": score_ok,
+        "score": np.where(score_ok, arrays["score"], 0.0),
+        "match_ok": ~np.isnan(base_score),
+    }
+
+
+def pattern_error(params, columns):
+    """Why a profile's free-text filters can't be matched (an invalid str.contains pattern), or None"""
+    _, run_type, terrain, _, _, pain = params
+    patterns = [
+        (run_type, columns["run_type"]),
+        (terrain, columns["terrain"]),
+        ("" if pain in NO_PAIN_QUERIES else pain, columns["pain"]),
+    ]
+    for pattern, col in patterns:
+        if pattern and col is not None:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                return str(e)
+    return None
+
+
+def _profile_bitmaps(params, index, columns):
+    """Base criteria (run type, terrain, foot width, weight), no-pain keep bitmap and pain bitmap for one profile"""
+    _, run_type, terrain, foot_width, weight, pain = params
+    all_rows = index.all_rows()
+    empty = np.zeros_like(all_rows)
+    criteria = [
+        index.contains("run_type", run_type) if run_type and columns["run_type"] is not None else all_rows,
+        index.contains("terrain", terrain) if terrain and columns["terrain"] is not None else all_rows,
+        index.equals("foot_width", foot_width) if foot_width and columns["foot_width"] is not None else all_rows,
+        index.equals("weight", weight) if weight and columns["weight"] is not None else all_rows,
+    ]
+    keep, penalty = all_rows, empty
+    if pain and columns["pain"] is not None:
+        if pain in NO_PAIN_QUERIES:
+            keep = (
+                index.contains("pain", "no pain")
+                | index.contains("pain", "no discomfort")
+                | index.equals("pain", "none")
+            )
+        else:
+            penalty = index.contains("pain", pain)
+    return criteria, keep, penalty
+
+
+def _payloads_for_chunk(profiles, pages, index, columns, arrays, batch_arrays, goals):
+    """Same responses as get_recommendations + recommendations_payload, for a chunk of normalized profiles
+    and their (limit, offset) pages"""
+    n_profiles = len(profiles)
+    bitmaps = [_profile_bitmaps(params, index, columns) for params in profiles]
+    criteria = np.stack([np.stack(criteria) for criteria, _, _ in bitmaps])  # profiles x 4 x bytes
+    keep = np.stack([keep for _, keep, _ in bitmaps])
+    penalty = np.stack([penalty for _, _, penalty in bitmaps])
+    has_penalty = np.array([bool(params[5]) and params[5] not in NO_PAIN_QUERIES and columns["pain"] is not None
+                            for params in profiles])
+
+    # Every tier of every profile at once: profiles x tiers x bytes
+    tiers = np.bitwise_and.reduce(
+        np.where(_TIER_FLAGS[None, :, :, None], criteria[:, None, :, :], index.all_rows()), axis=2
+    )
+    tiers &= keep[:, None, :]
+    pain_safe = tiers & ~penalty[:, None, :]
+    pain_fallbacks = has_penalty[:, None] & (index.counts(pain_safe) == 0)
+    tiers = np.where(pain_fallbacks[:, :, None], tiers, pain_safe)
+
+    tier_counts = index.counts(tiers)
+    found = tier_counts.any(axis=1)
+    chosen = np.argmax(tier_counts > 0, axis=1)
+    selected_bits = np.unpackbits(tiers[np.arange(n_profiles), chosen], axis=1, count=index.n_rows)
+
+    # Bonus code matrix (profiles x reviews), then each cell's match percentage from the per-snapshot table
+    n_rows = index.n_rows
+    use_weight = np.array([bool(params[4]) and columns["weight"] is not None for params in profiles])
+    weight_bitmaps = np.stack([
+        index.equals("weight", params[4]) if use_weight[i] else np.zeros_like(index.all_rows())
+        for i, params in enumerate(profiles)
+    ])
+    bonus_codes = np.unpackbits(weight_bitmaps, axis=1, count=n_rows)
+    bonus_codes |= goals["masks"][[goals["codes"][params[0]] for params in profiles]] << 1
+    bonus_codes |= (np.unpackbits(penalty, axis=1, count=n_rows) & has_penalty[:, None]) << 2
+    bonus_codes |= (1 - selected_bits) << 3
+    match_percentage = batch_arrays["match_table"][np.arange(n_rows) * _CODES + bonus_codes]
+
+    # Per-trainer sums over the selected reviews (NaN-skipping): one bincount over (profile, trainer) pairs,
+    # so memory scales with the selected reviews rather than with reviews x trainers
+    codes = arrays["trainer_codes"]
+    n_trainers = len(arrays["trainer_names"])
+    profile_rows, review_rows = np.nonzero(selected_bits & (codes >= 0))
+    groups = profile_rows * n_trainers + codes[review_rows]
+
+    def per_trainer(keep=None, weights=None):
+        keys = groups if keep is None else groups[keep]
+        return np.bincount(keys, weights=weights, minlength=n_profiles * n_trainers).reshape(n_profiles, n_trainers)
+
+    rows_per_trainer = per_trainer()
+    num_reviews = per_trainer(keep=batch_arrays["score_ok"][review_rows])
+    score_sums = per_trainer(weights=batch_arrays["score"][review_rows])
+    match_counts = per_trainer(keep=batch_arrays["match_ok"][review_rows])
+    match_sums = per_trainer(weights=match_percentage[profile_rows, review_rows])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_score = score_sums / num_reviews
+        avg_match = match_sums / match_counts
+
+    trainer_names = np.asarray(arrays["trainer_names"], dtype=object)
+    payloads = []
+    for i in range(n_profiles):
+        if not found[i]:
+            payloads.append(recommendations_payload(None))
+            continue
+        trainers = np.flatnonzero(rows_per_trainer[i] > 0)
+        if len(trainers) == 0:
+            payloads.append(recommendations_payload(None))
+            continue
+        # Match_Percentage then Avg_Score, both descending, NaN last, ties in trainer order
+        limit, offset = pages[i]
+        end = None if limit is None else offset + limit
+        order = trainers[top_trainers(avg_match[i, trainers], avg_score[i, trainers], end)][offset:]
+        tier = chosen[i]
+        cautions = []
+        if pain_fallbacks[i, 0]:
+            cautions.append("No pain-safe exact matches found; returned closest alternatives with pain penalty.")
+        if tier > 0:
+            cautions.append("No exact matches found; filters were relaxed to provide close matches.")
+            if pain_fallbacks[i, tier]:
+                cautions.append("Pain preference was applied as a penalty for close-match fallback.")
+        data = [
+            {
+                "Trainer Model": trainer_names[k],
+                "Avg_Score": float(np.round(avg_score[i, k], 1)),
+                "Num_Reviews": int(num_reviews[i, k]),
+                "Match_Percentage": float(np.round(avg_match[i, k], 0)),
+            }
+            for k in order
+        ]
+        payloads.append({
+            "success": True,
+            "data": data,
+            "count": len(data),
+            "total": len(trainers),
+            "strategy_used": FILTER_TIERS[tier][0],
+            "cautions": cautions,
+        })
+    return payloads
+
+
+def iter_batch_recommendations(profiles, snapshot, pages=None, chunk_cells=BATCH_RECOMMENDATION_CHUNK_CELLS):
+    """Yield one /recommendations response per normalized profile (in order), scoring them in chunks.
+
+    pages optionally gives a (limit, offset) per profile. Each chunk is a profiles x reviews matrix of at most
+    `chunk_cells` cells; identical requests are scored once. A profile whose filters aren't valid patterns gets
+    {"error": message} and doesn't affect the others.
+    """
+    columns = get_schema(snapshot)
+    df = snapshot.df
+    usable = (
+        not df.empty
+        and columns["score"] is not None
+        and columns["five_k"] is not None
+        and columns["trainer"] is not None
+        and columns["comfort"] is not None
+        and columns["cushioning"] is not None
+        and columns["responsiveness"] is not None
+    )
+    if not usable:
+        for _ in profiles:
+            yield recommendations_payload(None)
+        return
+
+    index = get_filter_index(snapshot, columns)
+    arrays = get_scoring_arrays(snapshot, columns)
+    batch_arrays = snapshot.derive(
+        ("batch_arrays", columns["trainer"], columns["score"], columns["comfort"], columns["cushioning"],
+         columns["responsiveness"]),
+        lambda _: _build_batch_arrays(arrays),
+    )
+
+    # Run goal bonus rows, one mask per distinct goal (code 0 = no bonus)
+    codes = {}
+    masks = [np.zeros(index.n_rows, dtype=np.uint8)]
+    for run_goal in dict.fromkeys(params[0] for params in profiles):
+        mask = run_goal_mask(run_goal, index, arrays)
+        codes[run_goal] = 0 if mask is None else len(masks)
+        if mask is not None:
+            masks.append(mask.astype(np.uint8))
+    goals = {"codes": codes, "masks": np.stack(masks)}
+
+    chunk_size = max(1, chunk_cells // max(index.n_rows, 1))
+    requests = list(zip(profiles, pages or [(None, 0)] * len(profiles)))
+    errors = {params: pattern_error(params, columns) for params in dict.fromkeys(profiles)}
+    # Yields left per distinct request, so each payload is let go once it has been sent for the last time
+    remaining = Counter(requests)
+    unique_requests = [request for request in remaining if errors[request[0]] is None]
+    results = {}
+    next_unique = 0
+    for request in requests:
+        if errors[request[0]] is not None:
+            yield {"error": errors[request[0]]}
+            continue
+        while request not in results:
+            chunk = unique_requests[next_unique:next_unique + chunk_size]
+            next_unique += len(chunk)
+            payloads = _payloads_for_chunk(
+                [params for params, _ in chunk], [page for _, page in chunk], index, columns, arrays, batch_arrays,
+                goals,
+            )
+            results.update(zip(chunk, payloads))
+        remaining[request] -= 1
+        yield results[request] if remaining[request] else results.pop(request)
@@ -1,135 +1,26 @@
+import hashlib
+import json
+import os
+import sys
+
 import pandas as pd
-from services.sheets_service import SheetsService
-from config.settings import SHEET_RAW_DATA, SHEET_CLEAN_DATA
+from services.storage import get_storage
+from config.settings import SHEET_RAW_DATA, SHEET_CLEAN_DATA, CLEANING_STATE_FILE
+from analysis.schema_mapping import get_column_mapping
 
-def clean_data():
-    """Clean raw data and write to Clean Live Data sheet"""
-    print("Starting data cleaning...")
-    
-    sheets = SheetsService()
-    
-    # Read raw data manually to handle duplicate column names
-    sheet = sheets.get_sheet(SHEET_RAW_DATA)
-    all_values = sheet.get_all_values()
-    
-    if not all_values:
-        print("Error: No data found")
-        return None
-    
-    # Get headers and data
-    headers = all_values[0]
-    data_rows = all_values[1:]
-    
-    # Create DataFrame with original headers
-    df_raw = pd.DataFrame(data_rows, columns=headers)
-    
-    # Print ALL headers with positions for debugging
-    print(f"\nFound {len(headers)} columns in raw data:")
-    print("=" * 80)
-    for i, col in enumerate(headers):
-        print(f"  [{i}] {col}")
-    print("=" * 80)
-    
-    import re
-    
-    # Define column mapping with more specific patterns
-    # Order matters - more specific patterns should come first
-    column_patterns = [
-        # Exact or very specific matches first
-        (r'^.*submission.*id.*$', "Submission ID", False),
-        (r'^.*submitted.*at.*$', "Submitted at", False),
-        (r'^.*name.*$', "Name", False),
-        (r'^.*what.*gender.*do.*you.*identify.*with.*\?$', "Gender", False),  # Main gender question
-        (r'^.*foot.*width.*$', "Foot Width", False),
-        (r'^.*trainer.*model.*$', "Trainer Model", False),  # Column K
-        (r'^.*run.*type.*$', "Run Type", False),
-        (r'^.*distance.*trainer.*km.*$', "Total Distance", False),
-        (r'^.*distance.*trainer.*$', "Total Distance", False),
-        (r'^.*terrain.*$', "Terrain", False),
-        (r'^.*months.*wear.*$', "Months Wearing", False),
-        (r'^.*post.*run.*feel.*$', "Post Run Feel", False),
-        (r'^.*pain.*experience.*$', "Pain Experienced", False),
-        (r'^.*more.*information.*$', "More Information", False),  # Column S
-        (r'^.*comfort.*rating.*$', "Comfort Rating", False),
-        (r'^.*cushioning.*rating.*$', "Cushioning Rating", False),
-        (r'^.*responsiveness.*rating.*$', "Responsiveness Rating", False),
-        (r'^.*easy.*run.*pace.*$', "Easy Run Pace", False),
-        (r'^.*average.*5k.*race.*time.*minutes.*$', None, True),  # Drop this duplicate
-        (r'^.*average.*5k.*time.*$', "Average 5k Time", False),
-        (r'^.*5k.*time.*$', "Average 5k Time", False),
-        (r'^.*improvement.*suggestion.*$', "Improvement Suggestions", False),
-        (r'^.*magic.*wand.*change.*one.*thing.*$', None, True),  # Drop this duplicate
-        (r'^.*how.*do.*your.*trainers.*feel.*after.*typical.*run.*$', None, True),  # Drop this duplicate
-        (r'^.*would.*you.*recommend.*trainer.*friend.*\?.*$', "Would Recommend", False),
-        (r'^.*would.*recommend.*$', "Would Recommend", False),
-        (r'^.*score.*$', "Score", False),
-    ]
-    
-    # Columns to exclude from mapping (these will be dropped)
-    exclude_patterns = [
-        r'respondent.*id',
-        r'gender.*male',
-        r'gender.*female',
-        r'gender.*non-binary',
-        r'gender.*prefer.*not',
-        r'recommend.*yes',
-        r'recommend.*no',
-        r'recommend.*depends',
-    ]
-    
-    # Create mapping dictionary
-    column_mapping = {}
-    matched_clean_names = set()  # Track which clean names we've already mapped
-    columns_to_drop = []  # Track columns to drop
-    
-    # First, check if column should be excluded
-    def should_exclude(col_name):
-        col_lower = str(col_name).lower().strip()
-        for pattern in exclude_patterns:
-            if re.search(pattern, col_lower, re.IGNORECASE):
-                return True
-        return False
-    
-    # Match columns using patterns
-    print("\nMapping columns:")
-    print("-" * 80)
-    for col in headers:
-        col_lower = str(col).lower().strip()
-        
-        # Skip if should be excluded
-        if should_exclude(col):
-            print(f"  Excluding: '{col}'")
-            columns_to_drop.append(col)
-            continue
-        
-        # Skip if already mapped
-        if col in column_mapping:
-            continue
-        
-        # Try to match against patterns (in order)
-        matched = False
-        for pattern, clean_name, should_drop in column_patterns:
-            # Check pattern match
-            if re.search(pattern, col_lower, re.IGNORECASE):
-                if should_drop or clean_name is None:
-                    # This column should be dropped
-                    columns_to_drop.append(col)
-                    print(f"  Dropping duplicate: '{col}'")
-                    matched = True
-                    break
-                elif clean_name not in matched_clean_names:
-                    # Map to clean name
-                    column_mapping[col] = clean_name
-                    matched_clean_names.add(clean_name)
-                    print(f"  Mapped: '{col}' -> '{clean_name}'")
-                    matched = True
-                    break
-        
-        if not matched:
-            print(f"  No match: '{col}'")
-    
-    print("-" * 80)
-    
+
+def map_columns(headers):
+    """Decide which raw Tally headers map to which clean names, and which get dropped (see get_column_mapping)"""
+    result = get_column_mapping(headers)
+    print(
+        f"Column mapping: {len(result['mapping'])} mapped, {len(result['dropped'])} duplicates dropped, "
+        f"{len(result['excluded'])} excluded, {len(result['unmatched'])} unmatched"
+    )
+    return result["mapping"], result["excluded"] + result["dropped"]
+
+
+def clean_frame(df_raw, column_mapping, columns_to_drop):
+    """Rename, drop and type-convert raw rows using a column mapping"""
     # Apply the mapping
     df_raw = df_raw.rename(columns=column_mapping)
     
@@ -173,12 +64,138 @@ def clean_data():
     if 'Total Distance' in df_processed.columns:
         df_processed['Total Distance'] = pd.to_numeric(df_processed['Total Distance'], errors='coerce')
     
+    # Keep the raw -> clean mapping with the frame for anything downstream that needs the original headers
+    df_processed.attrs["column_mapping"] = dict(column_mapping)
+    return df_processed
+
+
+def _headers_hash(headers):
+    return hashlib.sha1(json.dumps(headers).encode("utf-8")).hexdigest()
+
+
+def load_cleaning_state(path=None):
+    """Watermark of the last cleaning run (None if there hasn't been one)"""
+    try:
+        with open(path or CLEANING_STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cleaning_state(state, path=None):
+    path = path or CLEANING_STATE_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def _watermark(headers, data_rows, column_mapping, clean_columns):
+    """Remember how far into rawdata we got: row count plus the last row's Submission ID / Submitted at
+    (Clean Live Data holds one row per raw row, so the same count and ID describe what was written there)"""
+    last_row = data_rows[-1] if data_rows else []
+
+    def last_value(clean_name):
+        for i, col in enumerate(headers):
+            if column_mapping.get(col) == clean_name and i < len(last_row):
+                return last_row[i]
+        return None
+
+    return {
+        "raw_headers_hash": _headers_hash(headers),
+        "raw_rows": len(data_rows),
+        "clean_rows": len(data_rows),
+        "last_submission_id": last_value("Submission ID"),
+        "last_submitted_at": last_value("Submitted at"),
+        "clean_columns": list(clean_columns),
+    }
+
+
+def clean_data(sheets=None, full_rebuild=False):
+    """Clean raw data into the Clean Live Data sheet (only new submissions unless full_rebuild)"""
+    sheets = sheets or get_storage()
+    
+    if not full_rebuild:
+        state = load_cleaning_state()
+        if state is None or not state.get("last_submission_id"):
+            print("No cleaning watermark found, doing a full rebuild")
+        else:
+            result = _clean_new_rows(sheets, state)
+            if result is not None:
+                return result
+    
+    print("Starting data cleaning...")
+    
+    # Read raw data manually to handle duplicate column names
+    all_values = sheets.read_values(SHEET_RAW_DATA)
+    
+    if not all_values:
+        print("Error: No data found")
+        return None
+    
+    # Get headers and data
+    headers = all_values[0]
+    data_rows = all_values[1:]
+    
+    # Create DataFrame with original headers
+    df_raw = pd.DataFrame(data_rows, columns=headers)
+    
+    print(f"\nFound {len(headers)} columns in raw data")
+    
+    column_mapping, columns_to_drop = map_columns(headers)
+    df_processed = clean_frame(df_raw, column_mapping, columns_to_drop)
+    
     # Write to Clean Live Data sheet
     sheets.write_dataframe(SHEET_CLEAN_DATA, df_processed)
+    save_cleaning_state(_watermark(headers, data_rows, column_mapping, df_processed.columns))
     
     print("\n[OK] Data cleaning complete")
     print(f"Final columns ({len(df_processed.columns)}): {list(df_processed.columns)}")
     return df_processed
 
+
+def _clean_new_rows(sheets, state):
+    """Append only rawdata rows after the watermark; None means a full rebuild is needed"""
+    print("Starting incremental data cleaning...")
+    
+    # Re-read the last processed row too, to check rawdata wasn't edited or reordered since
+    headers, rows = sheets.read_rows(SHEET_RAW_DATA, state["raw_rows"])
+    if not headers or _headers_hash(headers) != state["raw_headers_hash"]:
+        print("Raw headers changed since the last run, doing a full rebuild")
+        return None
+    
+    column_mapping, columns_to_drop = map_columns(headers)
+    id_positions = [i for i, col in enumerate(headers) if column_mapping.get(col) == "Submission ID"]
+    if not rows or not id_positions or rows[0][id_positions[0]] != state["last_submission_id"]:
+        print("Raw rows changed before the watermark, doing a full rebuild")
+        return None
+    
+    # The watermark is local to this machine: make sure Clean Live Data still ends where it says
+    # (it may have been cleared, edited or rebuilt from another machine since)
+    clean_ids = sheets.read_column(SHEET_CLEAN_DATA, "Submission ID")
+    clean_rows = state.get("clean_rows", state["raw_rows"])
+    if clean_ids is None or len(clean_ids) != clean_rows or clean_ids[-1:] != [state["last_submission_id"]]:
+        print(f"{SHEET_CLEAN_DATA} doesn't match the cleaning watermark, doing a full rebuild")
+        return None
+    
+    new_rows = rows[1:]
+    if not new_rows:
+        print("[OK] No new submissions since the last run")
+        return pd.DataFrame(columns=state["clean_columns"])
+    
+    df_processed = clean_frame(pd.DataFrame(new_rows, columns=headers), column_mapping, columns_to_drop)
+    if list(df_processed.columns) != state["clean_columns"]:
+        print("Clean columns changed since the last run, doing a full rebuild")
+        return None
+    
+    sheets.append_dataframe(SHEET_CLEAN_DATA, df_processed)
+    
+    new_state = _watermark(headers, new_rows, column_mapping, df_processed.columns)
+    new_state["raw_rows"] = state["raw_rows"] + len(new_rows)
+    new_state["clean_rows"] = clean_rows + len(df_processed)
+    save_cleaning_state(new_state)
+    
+    print(f"\n[OK] Appended {len(df_processed)} new submissions to {SHEET_CLEAN_DATA}")
+    return df_processed
+
 if __name__ == "__main__":
-    clean_data()
\ No newline at end of file
+    clean_data(full_rebuild="--full" in sys.argv)
\ No newline at end of file
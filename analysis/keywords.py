@@ -1,37 +1,116 @@
+import itertools
 import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import string
 from collections import Counter
-from services.sheets_service import SheetsService
-from config.settings import SHEET_CLEAN_DATA, SHEET_KEYWORD_FREQ
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-    
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+from functools import lru_cache
+from services.storage import get_storage
+from analysis.schema import schema_for, text_columns
+from analysis.text_features import get_text_features, load_nltk, process_pool
+from config.settings import SHEET_CLEAN_DATA, SHEET_KEYWORD_FREQ, KEYWORD_WORKERS, KEYWORD_PARALLEL_MIN_ROWS
+
+# Keywords written to the Keyword Frequency sheet
+TOP_KEYWORDS = 20
+
+
+@lru_cache(maxsize=None)
+def _stop_words():
+    """English stopwords as a frozenset, built once per process"""
+    return frozenset(load_nltk().corpus.stopwords.words("english"))
+
+
+def keywords(tokens, stop_words):
+    """Keywords of one answer's (lower-cased) tokens: alphabetic words longer than two letters that aren't stopwords"""
+    for word in tokens:
+        if len(word) > 2 and word.isalpha() and word not in stop_words:
+            yield word
+
+
+def _text_rows(df, text_fields, trainer_col, features):
+    """(trainer, column, answer tokens) for every non-missing text cell, column by column"""
+    if trainer_col is not None:
+        trainers = df[trainer_col].astype(object)
+        trainers = trainers.where(trainers.notna(), None)
+    else:
+        trainers = pd.Series(None, index=df.index, dtype=object)
+    for label, col in text_fields:
+        present = df[col].notna()
+        yield from zip(trainers[present], itertools.repeat(label), features[label]["tokens"][present])
+
+
+def _count_rows(rows):
+    """Keyword Counters for (trainer, column, answer tokens) rows: overall, per trainer and per column"""
+    stop_words = _stop_words()
+    # Each distinct answer ("none", "no pain", ...) is filtered once; rows only count occurrences
+    answer_keywords = {}
+    first_seen = {}  # keyword -> None, in order of first occurrence (most_common breaks ties by it)
+    answers_by_pair = {}
+    for trainer, column, tokens in rows:
+        if tokens not in answer_keywords:
+            answer_keywords[tokens] = Counter(keywords(tokens, stop_words))
+            first_seen.update(dict.fromkeys(answer_keywords[tokens]))
+        pair = (trainer, column)
+        if pair not in answers_by_pair:
+            answers_by_pair[pair] = Counter()
+        answers_by_pair[pair][tokens] += 1
 
-def analyze_keywords():
+    total, by_trainer, by_column = Counter(dict.fromkeys(first_seen, 0)), {}, {}
+    for (trainer, column), answers in answers_by_pair.items():
+        counts = Counter()
+        for tokens, occurrences in answers.items():
+            for word, count in answer_keywords[tokens].items():
+                counts[word] += count * occurrences
+        total.update(counts)
+        by_column.setdefault(column, Counter()).update(counts)
+        if trainer is not None:
+            by_trainer.setdefault(trainer, Counter()).update(counts)
+    return {"total": total, "by_trainer": by_trainer, "by_column": by_column}
+
+
+def merge_keyword_counts(parts):
+    """Combine the keyword counts of consecutive shards (merged in order, so ties keep first-seen order)"""
+    merged = {"total": Counter(), "by_trainer": {}, "by_column": {}}
+    for part in parts:
+        merged["total"].update(part["total"])
+        for breakdown in ("by_trainer", "by_column"):
+            for name, counts in part[breakdown].items():
+                merged[breakdown].setdefault(name, Counter()).update(counts)
+    return merged
+
+
+def count_keywords(rows, n_rows, workers=KEYWORD_WORKERS, min_parallel=KEYWORD_PARALLEL_MIN_ROWS):
+    """Keyword counts for a stream of (trainer, column, answer tokens) rows.
+
+    Rows are consumed as they come in-process; with at least `min_parallel` of them they're split into
+    one consecutive shard per worker process and the shards' Counters merged.
+    """
+    if workers <= 1 or n_rows < min_parallel:
+        return _count_rows(rows)
+    # Make sure the corpora are downloaded once, before the workers look for them
+    load_nltk()
+    rows = list(rows)
+    shard_size = -(-len(rows) // workers)
+    shards = [rows[i:i + shard_size] for i in range(0, len(rows), shard_size)]
+    with process_pool(workers) as pool:
+        return merge_keyword_counts(pool.map(_count_rows, shards))
+
+
+def analyze_keywords(sheets=None, df=None):
     """Analyze keyword frequency from qualitative feedback"""
     print("Analyzing keyword frequency...")
     
-    sheets = SheetsService()
+    sheets = sheets or get_storage()
     
-    # Read clean data
-    df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
+    # Read clean data (or use the frame the pipeline shares; it is never modified here)
+    if df is None:
+        df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
     
     # Text columns to analyze
-    text_cols = ["Post Run Feel", "Pain Experienced", "Improvement Suggestions"]
+    schema = schema_for(df)
+    text_fields = text_columns(schema)
+    text_cols = [label for label, _ in text_fields]
     
     # Check which columns exist
-    existing_text_cols = [col for col in text_cols if col in df.columns]
+    existing_fields = [(label, col) for label, col in text_fields if col is not None]
+    existing_text_cols = [col for _, col in existing_fields]
     
     if not existing_text_cols:
         print(f"Warning: None of the text columns {text_cols} found in data")
@@ -39,29 +118,16 @@ def analyze_keywords():
     
     print(f"Found text columns: {existing_text_cols}")
     
-    # Combine all text
-    all_text = " ".join(
-        df[col].astype(str).fillna('').str.cat(sep=' ') 
-        for col in existing_text_cols
-    )
-    
-    if len(all_text.strip()) == 0:
+    # Stream the answers row by row (missing cells are skipped)
+    n_rows = int(sum(df[col].notna().sum() for _, col in existing_fields))
+    if n_rows == 0:
         print("Warning: No text content found to analyze")
         return None
     
-    # Tokenize and clean
-    tokens = word_tokenize(all_text.lower())
-    tokens = [
-        word for word in tokens
-        if word.isalpha() 
-        and word not in stopwords.words("english") 
-        and word not in string.punctuation
-        and len(word) > 2  # Filter out very short words
-    ]
-    
-    # Count keywords
-    word_counts = Counter(tokens)
-    keyword_df = pd.DataFrame(word_counts.most_common(20), columns=["Keyword", "Frequency"])
+    # Tokens come from the text feature store (new answers are tokenized once)
+    features = get_text_features(df, existing_fields)
+    counts = count_keywords(_text_rows(df, existing_fields, schema["trainer"], features), n_rows)
+    keyword_df = pd.DataFrame(counts["total"].most_common(TOP_KEYWORDS), columns=["Keyword", "Frequency"])
     
     if keyword_df.empty:
         print("Warning: No keywords found")
@@ -70,8 +136,12 @@ def analyze_keywords():
     # Write to Keyword Frequency sheet
     sheets.write_dataframe(SHEET_KEYWORD_FREQ, keyword_df)
     
+    # Full per-trainer and per-column breakdowns ({name: Counter}) for callers
+    keyword_df.attrs["by_trainer"] = counts["by_trainer"]
+    keyword_df.attrs["by_column"] = counts["by_column"]
+    
     print("[OK] Keyword frequency analysis complete")
-    print("\n[KEYWORDS] Top 20 Keywords:")
+    print(f"\n[KEYWORDS] Top {TOP_KEYWORDS} Keywords:")
     print(keyword_df)
     
     return keyword_df
@@ -1,37 +1,47 @@
-print("=== LEADERBOARD MODULE LOADED ===")
 import pandas as pd
 from datetime import datetime
-from services.sheets_service import SheetsService
+from services.storage import get_storage
+from analysis.schema import schema_for
+from analysis.typed_frame import plain_columns
 from config.settings import SHEET_CLEAN_DATA, SHEET_LEADERBOARD
 
-def create_leaderboard():
+def create_leaderboard(sheets=None, write=True, df=None):
     """Create top 5 trainers leaderboard"""
     print("Creating leaderboard...")
     
-    sheets = SheetsService()
+    sheets = sheets or get_storage()
     
-    # Read clean data
-    df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
+    # Read clean data (or use the frame the pipeline shares; it is never modified here)
+    if df is None:
+        df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
     
-    # Convert Score to numeric
-    if 'Score' in df.columns:
-        df['Score'] = pd.to_numeric(df['Score'], errors='coerce')
-    else:
+    schema = schema_for(df)
+    score_col = schema["score"]
+    trainer_col = schema["trainer"]
+    
+    if score_col is None:
         print("Error: 'Score' column not found")
         return None
     
     # Create leaderboard
-    if 'Trainer Model' not in df.columns:
+    if trainer_col is None:
         print("Error: 'Trainer Model' column not found")
         return None
     
+    # Score is already numeric (float64) in the snapshot
+    scores = pd.DataFrame({
+        trainer_col: df[trainer_col],
+        score_col: pd.to_numeric(df[score_col], errors='coerce').astype(float),
+    })
     leaderboard = (
-        df.groupby("Trainer Model")
+        scores.groupby(trainer_col, observed=True)
         .agg(
-            Avg_Score=("Score", "mean"),
-            Respondents=("Score", "count")
+            Avg_Score=(score_col, "mean"),
+            Respondents=(score_col, "count")
         )
         .reset_index()
+        .rename(columns={trainer_col: "Trainer Model"})
+        .pipe(plain_columns)
         .sort_values(by="Avg_Score", ascending=False)
         .head(5)
     )
@@ -40,7 +50,8 @@ def create_leaderboard():
     leaderboard['Timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     # Write to Leaderboard sheet
-    sheets.write_dataframe(SHEET_LEADERBOARD, leaderboard)
+    if write:
+        sheets.write_dataframe(SHEET_LEADERBOARD, leaderboard)
     
     print("[OK] Leaderboard created")
     print("\n[TOP 5] Top 5 Trainers:")
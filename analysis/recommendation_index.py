@@ -0,0 +1,128 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from analysis.typed_frame import normalized_codes
+
+# Number of set bits in every possible byte, used to count rows in a packed bitmap
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Free-text queries are memoized per column; cap the memo so arbitrary input can't grow it forever
+_MAX_CACHED_PATTERNS = 256
+
+
+class TermMatcher:
+    """Finds every vocabulary term contained in a text with one precompiled regex pass"""
+
+    def __init__(self, terms):
+        # Longest first, so at each position the alternation reports the longest term starting there;
+        # shorter terms starting at the same position are its prefixes and get added from _implied
+        self.terms = sorted(set(terms), key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(term) for term in self.terms) + "))")
+        self._implied = {term: [other for other in self.terms if term.startswith(other)] for term in self.terms}
+
+    def find(self, text):
+        """Set of terms that occur in `text` (plain substring semantics)"""
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._implied[match.group(1)])
+        return found
+
+
+class ValueIndex:
+    """Inverted index from each normalized value of one column to a packed row bitmap"""
+
+    def __init__(self, series):
+        codes, uniques = normalized_codes(series)
+        self.n_rows = len(series)
+        self.values = pd.Series(uniques, dtype=object)
+        self.bitmaps = [np.packbits(codes == i) for i in range(len(uniques))]
+        self._positions = {value: i for i, value in enumerate(uniques)}
+        self._contains_cache = {}
+        self.term_bitmaps = {}
+
+    def tag(self, matcher):
+        """Precompute a row bitmap for every term of a vocabulary (one matcher pass per distinct value)"""
+        term_bitmaps = {term: empty_bitmap(self.n_rows) for term in matcher.terms}
+        for position, value in enumerate(self.values):
+            for term in matcher.find(value):
+                term_bitmaps[term] = term_bitmaps[term] | self.bitmaps[position]
+        self.term_bitmaps = term_bitmaps
+
+    def equals(self, value):
+        """Bitmap of rows whose normalized value equals `value`"""
+        position = self._positions.get(str(value).lower().strip())
+        if position is None:
+            return empty_bitmap(self.n_rows)
+        return self.bitmaps[position]
+
+    def contains(self, pattern):
+        """Bitmap of rows whose normalized value contains `pattern` (same semantics as str.contains)"""
+        # Tagged vocabulary terms are plain words, so their substring bitmaps answer the query directly
+        bitmap = self.term_bitmaps.get(pattern)
+        if bitmap is not None:
+            return bitmap
+        bitmap = self._contains_cache.get(pattern)
+        if bitmap is None:
+            bitmap = empty_bitmap(self.n_rows)
+            hits = self.values.str.contains(pattern, na=False).to_numpy()
+            for position in np.flatnonzero(hits):
+                bitmap = bitmap | self.bitmaps[position]
+            if len(self._contains_cache) >= _MAX_CACHED_PATTERNS:
+                self._contains_cache.clear()
+            self._contains_cache[pattern] = bitmap
+        return bitmap
+
+
+class RecommendationIndex:
+    """Bitmaps for the recommendation filter columns, built once per data snapshot"""
+
+    def __init__(self, df, columns, vocabularies=None):
+        self.n_rows = len(df)
+        self.fields = {
+            field: ValueIndex(df[col])
+            for field, col in columns.items()
+            if col is not None
+        }
+        for field, matcher in (vocabularies or {}).items():
+            if field in self.fields:
+                self.fields[field].tag(matcher)
+        self._all_rows = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def all_rows(self):
+        return self._all_rows
+
+    def contains(self, field, pattern):
+        """Bitmap of rows whose `field` contains `pattern` (no rows if the column is missing)"""
+        if field not in self.fields:
+            return empty_bitmap(self.n_rows)
+        return self.fields[field].contains(pattern)
+
+    def equals(self, field, value):
+        """Bitmap of rows whose `field` equals `value` (no rows if the column is missing)"""
+        if field not in self.fields:
+            return empty_bitmap(self.n_rows)
+        return self.fields[field].equals(value)
+
+    def count(self, bitmap):
+        """Number of rows selected by a bitmap"""
+        return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+    def counts(self, bitmaps):
+        """Number of rows selected by each bitmap in a 2-D stack"""
+        return _POPCOUNT[bitmaps].sum(axis=-1, dtype=np.int64)
+
+    def to_mask(self, bitmap):
+        """Unpack a bitmap into a boolean row mask"""
+        return np.unpackbits(bitmap, count=self.n_rows).astype(bool)
+
+
+def empty_bitmap(n_rows):
+    return np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+
+
+def get_recommendation_index(snapshot, columns, vocabularies=None):
+    """Get the filter index for a snapshot, building it on first use (vocabularies: field -> TermMatcher)"""
+    key = ("recommendation_index",) + tuple(sorted(columns.items(), key=lambda item: item[0]))
+    return snapshot.derive(key, lambda df: RecommendationIndex(df, columns, vocabularies))
@@ -0,0 +1,144 @@
+import itertools
+import os
+import threading
+import time
+
+from analysis.recommendations import (
+    COMMON_PAIN_QUERIES,
+    RUN_GOALS,
+    get_filter_index,
+    get_recommendations,
+    recommendations_payload,
+)
+from analysis.schema import get_schema
+from services.storage import get_storage
+from services.serialization import dumps, loads
+from config.settings import SHEET_CLEAN_DATA, RECOMMENDATION_TABLE_FILE
+
+# The table currently served: {"version": ..., "entries": {normalized request tuple: response payload}}
+_table = {"version": None, "entries": {}}
+_table_lock = threading.Lock()
+# Versions a background build was started for, and the (file mtime, data version) each table file was last
+# read for
+_building_versions = set()
+_loaded_file_mtimes = {}
+
+
+def _observed_options(index, field):
+    """Distinct normalized dropdown options seen in the data (multi-select answers are split on commas)"""
+    if field not in index.fields:
+        return []
+    options = set()
+    for value in index.fields[field].values:
+        options.update(part.strip() for part in str(value).split(","))
+    options.discard("")
+    options.discard("nan")
+    return sorted(options)
+
+
+def enumerate_requests(snapshot):
+    """Every normalized request the frontend dropdowns can produce for this snapshot's data"""
+    index = get_filter_index(snapshot, get_schema(snapshot))
+    return itertools.product(
+        RUN_GOALS,
+        _observed_options(index, "run_type"),
+        _observed_options(index, "terrain"),
+        [""] + _observed_options(index, "foot_width"),
+        [""] + _observed_options(index, "weight"),
+        [""] + COMMON_PAIN_QUERIES,
+    )
+
+
+def build_recommendation_table(snapshot=None, save=True):
+    """Precompute the /recommendations response for every enumerable input combination"""
+    print("Building recommendation table...")
+    if snapshot is None:
+        snapshot = get_storage().get_snapshot(SHEET_CLEAN_DATA)
+    
+    started = time.perf_counter()
+    entries = {}
+    for params in enumerate_requests(snapshot):
+        result = get_recommendations(*params, snapshot=snapshot, verbose=False)
+        entries[params] = recommendations_payload(result)
+    
+    table = {"version": snapshot.version, "entries": entries}
+    with _table_lock:
+        _table.update(table)
+    if save:
+        save_recommendation_table(table)
+    
+    print(f"[OK] Precomputed {len(entries)} recommendation requests in {time.perf_counter() - started:.1f}s")
+    return table
+
+
+def save_recommendation_table(table, path=None):
+    """Persist a table so other processes (the API) can load it"""
+    path = path or RECOMMENDATION_TABLE_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps({"version": table["version"], "entries": [[list(k), v] for k, v in table["entries"].items()]}))
+    os.replace(tmp_path, path)
+
+
+def load_recommendation_table(version, path=None):
+    """Load the persisted table if it was built from this data version"""
+    try:
+        with open(path or RECOMMENDATION_TABLE_FILE, "rb") as f:
+            stored = loads(f.read())
+    except (OSError, ValueError):
+        return False
+    if stored.get("version") != version:
+        return False
+    with _table_lock:
+        _table["version"] = version
+        _table["entries"] = {tuple(k): v for k, v in stored["entries"]}
+    return True
+
+
+def lookup_recommendations(params, version):
+    """Precomputed response for a normalized request, or None (not enumerable, or table is for other data)"""
+    with _table_lock:
+        if _table["version"] != version:
+            return None
+        return _table["entries"].get(params)
+
+
+def _table_file_changed(version, path=None):
+    """Whether the table file is worth reading for this data version: it was written, or the version changed,
+    since it was last read here (a missing file never is)"""
+    path = path or RECOMMENDATION_TABLE_FILE
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+    with _table_lock:
+        if _loaded_file_mtimes.get(path) == (mtime, version):
+            return False
+        _loaded_file_mtimes[path] = (mtime, version)
+    return True
+
+
+def ensure_recommendation_table(snapshot, build=False):
+    """Make a table for this snapshot available: load it from disk, or (if build) build it in the background.
+
+    Without build, the file is read again whenever it or the snapshot version changes, so a table main.py saved
+    before or after the API moved to this data version is still picked up.
+    """
+    with _table_lock:
+        if _table["version"] == snapshot.version or snapshot.version in _building_versions:
+            return
+    if (_table_file_changed(snapshot.version) and load_recommendation_table(snapshot.version)) or not build:
+        return
+    with _table_lock:
+        if snapshot.version in _building_versions:
+            return
+        _building_versions.add(snapshot.version)
+
+    def worker():
+        try:
+            build_recommendation_table(snapshot)
+        except Exception as e:
+            print(f"Warning: building the recommendation table failed: {e}")
+
+    threading.Thread(target=worker, name="recommendation-table", daemon=True).start()
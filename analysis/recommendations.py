@@ -1,51 +1,163 @@
-print("=== RECOMMENDATIONS MODULE LOADED ===")
+import numpy as np
 import pandas as pd
-from services.sheets_service import SheetsService
+from services.storage import get_storage
+from services.serialization import frame_records
 from config.settings import SHEET_CLEAN_DATA
+from analysis.recommendation_index import TermMatcher, get_recommendation_index
+from analysis.schema import get_schema
+from analysis.typed_frame import parse_5k_column
 
-TRAINER_MODEL_COL_ALT = "What's the brand and model of this trainer? e.g. Nike Pegasus 40 or Adidas Adizero Pro 4"
-COMFORT_COL_ALT = "How would you rate the overall comfort of the trainer?"
-CUSHIONING_COL_ALT = "Please rate the cushioning of the trainer"
-RESPONSIVENESS_COL_ALT = "Please rate the responsiveness of the trainer (how quickly it adapts and returns energy with each step)"
+# Filter tiers in fallback order, with the base filters each keeps: (run type, terrain, foot width, weight)
+FILTER_TIERS = [
+    ("exact_filters", (True, True, True, True)),
+    ("relaxed_weight", (True, True, True, False)),
+    ("relaxed_weight_and_foot_width", (True, True, False, False)),
+    ("relaxed_run_type_weight_foot_width", (False, True, False, False)),
+    ("relaxed_all_except_pain", (False, False, False, False)),
+]
 
+NO_PAIN_QUERIES = ["no pain", "no discomfort", "none"]
 
-def _resolve_column(df, preferred_name, *keywords):
-    if preferred_name in df.columns:
-        return preferred_name
-    key = [k.lower() for k in keywords]
-    for col in df.columns:
-        c = str(col).lower()
-        if all(k in c for k in key):
-            return col
+# Dropdown values offered by the frontend (normalized)
+RUN_GOALS = ["beginner/walk", "first 5k", "comfy/long run", "speed/tempo"]
+COMMON_PAIN_QUERIES = ["no pain", "knee", "heel", "arch", "shin", "ankle", "hip", "blister"]
+
+# Pain terms tagged on every review when the index is built; these queries are bitmap lookups,
+# anything else falls back to scanning the distinct Pain Experienced answers
+PAIN_VOCABULARY = COMMON_PAIN_QUERIES + [
+    "no discomfort", "none", "toe", "calf", "achilles", "plantar", "foot", "back", "blisters", "hips",
+]
+PAIN_MATCHER = TermMatcher(PAIN_VOCABULARY)
+
+# Columns that get a row bitmap index per snapshot
+INDEXED_FIELDS = ["run_type", "terrain", "foot_width", "weight", "pain"]
+
+# "sub N" 5k buckets that earn the run goal bonus (only these answers: "sub 33" earns nothing)
+FIRST_5K_BUCKETS = (30, 35, 40)
+BEGINNER_BUCKETS = (35, 40)
+
+
+def get_filter_index(snapshot, columns):
+    """Filter index over the indexed recommendation columns of a snapshot"""
+    return get_recommendation_index(
+        snapshot, {field: columns[field] for field in INDEXED_FIELDS}, {"pain": PAIN_MATCHER}
+    )
+
+
+def _build_scoring_arrays(df, columns):
+    def numeric(col):
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+    trainer_codes, trainer_names = pd.factorize(df[columns["trainer"]], sort=True)
+    if columns["five_k_bucket"] is not None:
+        five_k_bucket = df[columns["five_k_bucket"]].to_numpy()
+    else:
+        five_k_bucket = parse_5k_column(df[columns["five_k"]])[1]
+    return {
+        "trainer_codes": trainer_codes,
+        "trainer_names": trainer_names,
+        "score": numeric(columns["score"]),
+        "comfort": numeric(columns["comfort"]),
+        "cushioning": numeric(columns["cushioning"]),
+        "responsiveness": numeric(columns["responsiveness"]),
+        "five_k_bucket": five_k_bucket,
+    }
+
+
+def get_scoring_arrays(snapshot, columns):
+    """Trainer codes plus numeric Score/rating arrays for a snapshot, parsed once per data version"""
+    key = ("scoring_arrays", columns["trainer"], columns["score"], columns["comfort"], columns["cushioning"],
+           columns["responsiveness"], columns["five_k"])
+    return snapshot.derive(key, lambda df: _build_scoring_arrays(df, columns))
+
+
+def warm_indexes(snapshot):
+    """Build a snapshot's filter index and scoring arrays ahead of the first request (False if it can't be scored)"""
+    columns = get_schema(snapshot)
+    required = ["trainer", "score", "five_k", "comfort", "cushioning", "responsiveness"]
+    if snapshot.df.empty or any(columns[field] is None for field in required):
+        return False
+    get_filter_index(snapshot, columns)
+    get_scoring_arrays(snapshot, columns)
+    return True
+
+
+def aggregate_by_trainer(trainer_codes, trainer_names, score, match_percentage):
+    """Per-trainer Avg_Score / Num_Reviews / Match_Percentage (same as a groupby mean/count, NaN-skipping)"""
+    n_trainers = len(trainer_names)
+    valid = trainer_codes >= 0
+    has_rows = np.bincount(trainer_codes[valid], minlength=n_trainers) > 0
+
+    def group_mean(values):
+        ok = valid & ~np.isnan(values)
+        counts = np.bincount(trainer_codes[ok], minlength=n_trainers)
+        sums = np.bincount(trainer_codes[ok], weights=values[ok], minlength=n_trainers)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts, counts
+
+    avg_score, num_reviews = group_mean(score)
+    avg_match, _ = group_mean(match_percentage)
+    return pd.DataFrame({
+        "Trainer Model": np.asarray(trainer_names, dtype=object)[has_rows],
+        "Avg_Score": avg_score[has_rows],
+        "Num_Reviews": num_reviews[has_rows],
+        "Match_Percentage": avg_match[has_rows],
+    })
+
+
+def top_trainers(match_percentage, avg_score, k=None):
+    """Positions of the k best trainers by Match_Percentage then Avg_Score (descending, NaN last, ties in
+    position order), i.e. a stable two-key sort_values followed by head(k).
+
+    Only the trainers that can make the top k (argpartition on Match_Percentage, boundary ties included)
+    get sorted, so the cost scales with k rather than with the number of trainers.
+    """
+    primary = np.where(np.isnan(match_percentage), np.inf, -match_percentage)
+    secondary = np.where(np.isnan(avg_score), np.inf, -avg_score)
+    if k is None or k >= len(primary):
+        candidates = np.arange(len(primary))
+    elif k <= 0:
+        return np.arange(0)
+    else:
+        kth = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= kth)
+    order = candidates[np.lexsort((candidates, secondary[candidates], primary[candidates]))]
+    return order[:k]
+
+
+def run_goal_mask(run_goal, index, arrays):
+    """Rows earning the +3 bonus for a normalized run goal (None if the goal gives no bonus)"""
+    if run_goal == "speed/tempo":
+        return arrays["responsiveness"] > 8
+    if run_goal == "comfy/long run":
+        comfy_bitmap = (
+            index.contains("run_type", "long run")
+            | index.contains("run_type", "easy")
+            | index.contains("run_type", "recovery")
+        )
+        return index.to_mask(comfy_bitmap)
+    if run_goal in ("first 5k", "beginner/walk"):
+        buckets = FIRST_5K_BUCKETS if run_goal == "first 5k" else BEGINNER_BUCKETS
+        return np.isin(arrays["five_k_bucket"], buckets)
     return None
 
 
-def parse_5k_time(time_str):
-    """Convert 'sub 20', 'sub 25', '40 minutes', '40 mins' etc to numeric value"""
-    import re
-    if pd.isna(time_str) or time_str == '':
-        return None
-    
-    time_str = str(time_str).lower().strip()
-    
-    # Remove "sub" so "sub 40" or "sub40" leave "40"
-    if 'sub' in time_str:
-        time_str = time_str.replace('sub', '').strip()
-    
-    # Extract first number (handles "40", "40 minutes", "40 mins", "40-45" -> 40)
-    match = re.search(r'(\d+)', time_str)
-    if match:
-        try:
-            return float(match.group(1))
-        except (ValueError, TypeError):
-            return None
-    try:
-        return float(time_str)
-    except (ValueError, TypeError):
-        return None
+def _quiet(*args, **kwargs):
+    pass
+
 
+def normalize_request(run_goal, run_type, terrain, foot_width=None, weight=None, pain=None):
+    """Lower-case and strip recommendation inputs; equal tuples always get the same recommendations"""
+    values = [(value or "").strip().lower() for value in (run_goal, run_type, terrain, foot_width, weight, pain)]
+    # "any" means "no preference" for foot width, weight and pain, exactly like leaving them blank
+    for i in (3, 4, 5):
+        if values[i] == "any":
+            values[i] = ""
+    return tuple(values)
 
-def get_recommendations(run_goal, run_type, terrain, foot_width=None, weight=None, pain=None):
+
+def get_recommendations(run_goal, run_type, terrain, foot_width=None, weight=None, pain=None, snapshot=None, verbose=True,
+                        limit=None, offset=0):
     """
     Get trainer recommendations based on user inputs
     
@@ -56,252 +168,201 @@ def get_recommendations(run_goal, run_type, terrain, foot_width=None, weight=Non
     - foot_width: str (e.g., "Narrow", "Regular", "Wide")
     - weight: str (e.g., "Under 65kg", "Between 65kg - 85kg")
     - pain: str (e.g., "heel pain", "knee pain", "no pain")
+    - snapshot: Clean Live Data snapshot to use (defaults to the cached one)
+    - verbose: print progress (turned off for bulk precomputation)
+    - limit/offset: return only this page of the ranking (all trainers by default)
     
     Returns:
-    - DataFrame with recommended trainers, or None if no matches
+    - DataFrame with recommended trainers, or None if no matches (attrs["total"] = trainers in the full ranking)
     """
-    print(f"\n{'='*50}")
-    print("STRIDELY RECOMMENDATION ENGINE")
-    print(f"{'='*50}")
-    print(
+    log = print if verbose else _quiet
+    log(f"\n{'='*50}")
+    log("STRIDELY RECOMMENDATION ENGINE")
+    log(f"{'='*50}")
+    log(
         f"Finding trainers for: goal={run_goal}, {run_type} on {terrain}, "
         f"foot width: {foot_width}, weight: {weight}, pain: {pain}"
     )
     
-    sheets = SheetsService()
-    df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
+    if snapshot is None:
+        snapshot = get_storage().get_snapshot(SHEET_CLEAN_DATA)
+    # Shared, read-only snapshot frame: only the chosen candidate rows are ever copied out of it
+    df = snapshot.df
     
     if df.empty:
-        print("ERROR: No data in Clean Live Data sheet")
+        log("ERROR: No data in Clean Live Data sheet")
         return None
     
-    # Convert Score to numeric
-    if 'Score' not in df.columns:
-        print("ERROR: 'Score' column not found")
+    # Logical -> actual column names, resolved once per snapshot
+    columns = get_schema(snapshot)
+    if columns["score"] is None:
+        log("ERROR: 'Score' column not found")
         return None
-    df['Score'] = pd.to_numeric(df['Score'], errors='coerce')
     
-    # Parse 5k times
-    if 'Average 5k Time' not in df.columns:
-        print("ERROR: 'Average 5k Time' column not found")
+    if columns["five_k"] is None:
+        log("ERROR: 'Average 5k Time' column not found")
         return None
-    df['5k_Time_Numeric'] = df['Average 5k Time'].apply(parse_5k_time)
     
-    print(f"\nTotal records in database: {len(df)}")
+    log(f"\nTotal records in database: {len(df)}")
     
     # ===========================================
     # FILTERING + FALLBACK STRATEGY
     # ===========================================
     
-    run_type_col = _resolve_column(df, "Run Type", "run", "type")
-    if run_type_col is None:
-        run_type_col = _resolve_column(df, "Type of Run", "type", "run")
-    terrain_col = _resolve_column(df, "Terrain", "terrain")
-    weight_col = _resolve_column(df, "Weight", "weight")
-    pain_col = _resolve_column(df, "Pain Experienced", "pain", "discomfort")
-    if pain_col is None:
-        pain_col = _resolve_column(df, "Pain Experienced", "pain")
-    if pain_col is None:
-        pain_col = _resolve_column(df, "Pain Experienced", "discomfort")
-    # Rating columns: prefer exact Clean Live Data headers, then fallback to short names/keyword matching
-    comfort_col = COMFORT_COL_ALT if COMFORT_COL_ALT in df.columns else _resolve_column(df, "Comfort", "comfort")
-    cushioning_col = CUSHIONING_COL_ALT if CUSHIONING_COL_ALT in df.columns else _resolve_column(df, "Cushioning", "cushioning")
-    responsiveness_col = (
-        RESPONSIVENESS_COL_ALT
-        if RESPONSIVENESS_COL_ALT in df.columns
-        else _resolve_column(df, "Responsiveness", "responsiveness")
-    )
-    five_k_col = _resolve_column(df, "Average 5k Time", "average", "5k", "time")
-    if five_k_col is None:
-        five_k_col = _resolve_column(df, "Average 5K Time", "average", "5k", "time")
-    trainer_col = "Trainer Model" if "Trainer Model" in df.columns else (
-        TRAINER_MODEL_COL_ALT if TRAINER_MODEL_COL_ALT in df.columns else _resolve_column(df, "Trainer Model", "brand", "model")
-    )
+    run_type_col = columns["run_type"]
+    terrain_col = columns["terrain"]
+    foot_width_col = columns["foot_width"]
+    weight_col = columns["weight"]
+    pain_col = columns["pain"]
+    trainer_col = columns["trainer"]
+    comfort_col = columns["comfort"]
+    cushioning_col = columns["cushioning"]
+    responsiveness_col = columns["responsiveness"]
 
-    # Resolve Foot Width column (sheet header may differ, e.g. trailing newline or full Tally question)
-    foot_width_col = None
-    if 'Foot Width' in df.columns:
-        foot_width_col = 'Foot Width'
-    else:
-        for col in df.columns:
-            c = str(col).lower().strip()
-            if 'foot' in c and 'width' in c:
-                foot_width_col = col
-                break
-    
-    def apply_base_filters(source_df, use_run_type=True, use_terrain=True, use_foot=True, use_weight=True, label=""):
-        out = source_df.copy()
-        if label:
-            print(f"\nApplying strategy: {label}")
-        if use_run_type and run_type and run_type_col is not None:
-            out = out[out[run_type_col].astype(str).str.lower().str.contains(run_type.lower(), na=False)]
-            print(f"After filtering by run type '{run_type}': {len(out)} records")
-        if use_terrain and terrain and terrain_col is not None:
-            out = out[out[terrain_col].astype(str).str.lower().str.contains(terrain.lower(), na=False)]
-            print(f"After filtering by terrain '{terrain}': {len(out)} records")
-        if use_foot and foot_width and foot_width.lower() not in ["", "any"] and foot_width_col is not None:
-            fw_series = out[foot_width_col].astype(str).str.lower().str.strip()
-            out = out[fw_series == foot_width.lower().strip()]
-            print(f"After filtering by foot width '{foot_width}': {len(out)} records")
-        if use_weight and weight and weight.lower() not in ["", "any"] and weight_col is not None:
-            weight_series = out[weight_col].astype(str).str.lower().str.strip()
-            out = out[weight_series == weight.lower().strip()]
-            print(f"After filtering by weight '{weight}': {len(out)} records")
-        return out
-
-    def apply_pain_filter(source_df):
-        out = source_df.copy()
-        used_local_pain_fallback = False
-        if pain and pain.lower() not in ["", "any"]:
-            if pain_col is None:
-                print("WARNING: 'Pain Experienced' column not found, skipping filter")
-            else:
-                pain_series = out[pain_col].astype(str).str.lower().str.strip()
-                pain_query = pain.lower().strip()
-                if pain_query in ["no pain", "no discomfort", "none"]:
-                    no_pain_mask = (
-                        pain_series.str.contains("no pain", na=False)
-                        | pain_series.str.contains("no discomfort", na=False)
-                        | pain_series.str.fullmatch("none", na=False)
-                    )
-                    out = out[no_pain_mask]
-                    print(f"After including no-pain reviews '{pain}': {len(out)} records")
-                else:
-                    out_before = out.copy()
-                    out = out[~pain_series.str.contains(pain_query, na=False)]
-                    print(f"After excluding pain '{pain}': {len(out)} records")
-                    if out.empty:
-                        out = out_before
-                        used_local_pain_fallback = True
-                        print("INFO: No results after pain exclusion; falling back to penalty-only pain scoring")
-        return out, used_local_pain_fallback
+    # Row bitmaps for every filter value, built once per data snapshot
+    index = get_filter_index(snapshot, columns)
+    all_rows = index.all_rows()
+
+    # One bitmap per base criterion; criteria that don't apply select every row
+    def criterion_bitmap(active, build, label):
+        if not active:
+            return all_rows
+        bitmap = build()
+        log(f"Reviews matching {label}: {index.count(bitmap)} records")
+        return bitmap
+
+    use_foot_width = bool(foot_width) and foot_width.lower() not in ["", "any"] and foot_width_col is not None
+    use_weight = bool(weight) and weight.lower() not in ["", "any"] and weight_col is not None
+    criteria = np.stack([
+        criterion_bitmap(bool(run_type) and run_type_col is not None,
+                         lambda: index.contains("run_type", run_type.lower()), f"run type '{run_type}'"),
+        criterion_bitmap(bool(terrain) and terrain_col is not None,
+                         lambda: index.contains("terrain", terrain.lower()), f"terrain '{terrain}'"),
+        criterion_bitmap(use_foot_width, lambda: index.equals("foot_width", foot_width), f"foot width '{foot_width}'"),
+        criterion_bitmap(use_weight, lambda: index.equals("weight", weight), f"weight '{weight}'"),
+    ])
+
+    # Every tier at once: each tier ANDs the criteria it keeps (dropped criteria are replaced by "all rows")
+    tier_flags = np.array([flags for _, flags in FILTER_TIERS])
+    tier_bitmaps = np.bitwise_and.reduce(np.where(tier_flags[:, :, None], criteria[None, :, :], all_rows), axis=1)
+
+    # Pain preference: keep only no-pain reviews, or exclude reviews mentioning the pain.
+    # A tier whose pain exclusion leaves nothing falls back to penalty-only pain scoring.
+    pain_query = pain.lower().strip() if pain else ""
+    use_pain = bool(pain) and pain.lower() not in ["", "any"] and pain_col is not None
+    pain_bitmap = None
+    pain_fallbacks = np.zeros(len(FILTER_TIERS), dtype=bool)
+    if pain and pain.lower() not in ["", "any"] and pain_col is None:
+        log("WARNING: 'Pain Experienced' column not found, skipping filter")
+    elif use_pain and pain_query in NO_PAIN_QUERIES:
+        no_pain_bitmap = (
+            index.contains("pain", "no pain")
+            | index.contains("pain", "no discomfort")
+            | index.equals("pain", "none")
+        )
+        tier_bitmaps = tier_bitmaps & no_pain_bitmap
+        log(f"Reviews with no pain '{pain}': {index.count(no_pain_bitmap)} records")
+    elif use_pain:
+        pain_bitmap = index.contains("pain", pain_query)
+        pain_safe = tier_bitmaps & ~pain_bitmap
+        pain_fallbacks = index.counts(pain_safe) == 0
+        tier_bitmaps = np.where(pain_fallbacks[:, None], tier_bitmaps, pain_safe)
+        log(f"Reviews mentioning pain '{pain}': {index.count(pain_bitmap)} records")
+
+    tier_counts = index.counts(tier_bitmaps)
+    for (tier_name, _), count in zip(FILTER_TIERS, tier_counts):
+        log(f"Strategy {tier_name}: {count} records")
 
     strategy_used = "exact_filters"
     cautions = []
-    base_df = df.copy()
-
-    # Tier 1: exact filters
-    df = apply_base_filters(base_df, True, True, True, True, "exact_filters")
-    df, used_pain_fallback = apply_pain_filter(df)
-    if used_pain_fallback:
+    if pain_fallbacks[0]:
         cautions.append("No pain-safe exact matches found; returned closest alternatives with pain penalty.")
-
-    # Tier 2+: relax filters if still empty
-    if df.empty:
-        tiers = [
-            ("relaxed_weight", dict(use_run_type=True, use_terrain=True, use_foot=True, use_weight=False)),
-            ("relaxed_weight_and_foot_width", dict(use_run_type=True, use_terrain=True, use_foot=False, use_weight=False)),
-            ("relaxed_run_type_weight_foot_width", dict(use_run_type=False, use_terrain=True, use_foot=False, use_weight=False)),
-            ("relaxed_all_except_pain", dict(use_run_type=False, use_terrain=False, use_foot=False, use_weight=False)),
-        ]
-        for tier_name, flags in tiers:
-            candidate = apply_base_filters(base_df, label=tier_name, **flags)
-            candidate, tier_pain_fallback = apply_pain_filter(candidate)
-            if not candidate.empty:
-                df = candidate
-                strategy_used = tier_name
-                cautions.append("No exact matches found; filters were relaxed to provide close matches.")
-                if tier_pain_fallback:
-                    cautions.append("Pain preference was applied as a penalty for close-match fallback.")
-                break
     
     # ===========================================
     # CHECK RESULTS
     # ===========================================
     
-    if df.empty:
-        print("\n[WARN] No trainers found matching all criteria")
-        print("Suggestions:")
-        print("  - Try broader run/terrain choices")
-        print("  - Try 'Mixed' terrain")
-        print("  - Try 'Regular' foot width")
+    non_empty_tiers = np.flatnonzero(tier_counts)
+    if len(non_empty_tiers) == 0:
+        log("\n[WARN] No trainers found matching all criteria")
+        log("Suggestions:")
+        log("  - Try broader run/terrain choices")
+        log("  - Try 'Mixed' terrain")
+        log("  - Try 'Regular' foot width")
         return None
     
+    chosen_tier = non_empty_tiers[0]
+    if chosen_tier > 0:
+        strategy_used = FILTER_TIERS[chosen_tier][0]
+        cautions.append("No exact matches found; filters were relaxed to provide close matches.")
+        if pain_fallbacks[chosen_tier]:
+            cautions.append("Pain preference was applied as a penalty for close-match fallback.")
+    log(f"\nUsing strategy: {strategy_used}")
+    
     if trainer_col is None:
-        print("ERROR: 'Trainer Model' column not found")
+        log("ERROR: 'Trainer Model' column not found")
         return None
     
     # ===========================================
     # MATCH SCORE CALCULATION
     # ===========================================
     if comfort_col is None or cushioning_col is None or responsiveness_col is None:
-        print("ERROR: Comfort/Cushioning/Responsiveness columns not found")
+        log("ERROR: Comfort/Cushioning/Responsiveness columns not found")
         return None
 
-    # Convert rating columns to numeric
-    df[comfort_col] = pd.to_numeric(df[comfort_col], errors='coerce')
-    df[cushioning_col] = pd.to_numeric(df[cushioning_col], errors='coerce')
-    df[responsiveness_col] = pd.to_numeric(df[responsiveness_col], errors='coerce')
+    selected = index.to_mask(tier_bitmaps[chosen_tier])
+    arrays = get_scoring_arrays(snapshot, columns)
+
+    def selected_flags(bitmap):
+        return index.to_mask(bitmap)[selected]
+
+    # Numeric ratings of the candidate rows (parsed once per snapshot)
+    comfort = arrays["comfort"][selected]
+    cushioning = arrays["cushioning"][selected]
+    responsiveness = arrays["responsiveness"][selected]
 
     # Base score
-    df["Base_Score"] = (df[comfort_col] + df[cushioning_col] + df[responsiveness_col]) / 3.0
+    base_score = (comfort + cushioning + responsiveness) / 3.0
 
     # Weight bonus (+2 exact match)
-    if weight and weight_col is not None and weight.lower() not in ["", "any"]:
-        weight_series = df[weight_col].astype(str).str.lower().str.strip()
-        df["Weight_Bonus"] = (weight_series == weight.lower().strip()).astype(int) * 2
+    if use_weight:
+        weight_bonus = selected_flags(index.equals("weight", weight)).astype(int) * 2
     else:
-        df["Weight_Bonus"] = 0
+        weight_bonus = 0
 
     # Run goal bonus (+3 based on run_goal logic)
     run_goal_norm = (run_goal or "").strip().lower()
-    run_type_series = df[run_type_col].astype(str).str.lower().str.strip() if run_type_col else pd.Series("", index=df.index)
-    five_k_series = df[five_k_col].astype(str).str.lower().str.strip() if five_k_col else pd.Series("", index=df.index)
-
-    df["Run_Goal_Bonus"] = 0
-    if run_goal_norm == "speed/tempo":
-        df.loc[df[responsiveness_col] > 8, "Run_Goal_Bonus"] = 3
-    elif run_goal_norm == "comfy/long run":
-        comfy_mask = (
-            run_type_series.str.contains("long run", na=False)
-            | run_type_series.str.contains("easy", na=False)
-            | run_type_series.str.contains("recovery", na=False)
-        )
-        df.loc[comfy_mask, "Run_Goal_Bonus"] = 3
-    elif run_goal_norm == "first 5k":
-        first_5k_mask = (
-            five_k_series.str.contains("sub 30", na=False)
-            | five_k_series.str.contains("sub 35", na=False)
-            | five_k_series.str.contains("sub 40", na=False)
-        )
-        df.loc[first_5k_mask, "Run_Goal_Bonus"] = 3
-    elif run_goal_norm == "beginner/walk":
-        beginner_mask = (
-            five_k_series.str.contains("sub 35", na=False)
-            | five_k_series.str.contains("sub 40", na=False)
-        )
-        df.loc[beginner_mask, "Run_Goal_Bonus"] = 3
+    run_goal_bonus = np.zeros(len(base_score), dtype=int)
+    goal_mask = run_goal_mask(run_goal_norm, index, arrays)
+    if goal_mask is not None:
+        run_goal_bonus[goal_mask[selected]] = 3
 
     # Pain penalty (-3 if reviewer pain contains user's pain type)
-    if pain and pain_col is not None and pain.lower() not in ["", "any"]:
-        pain_query = pain.lower().strip()
-        if pain_query in ["no pain", "no discomfort", "none"]:
-            df["Pain_Penalty"] = 0
-        else:
-            pain_series_all = df[pain_col].astype(str).str.lower().str.strip()
-            df["Pain_Penalty"] = pain_series_all.str.contains(pain_query, na=False).astype(int) * 3
+    if pain_bitmap is not None:
+        pain_penalty = selected_flags(pain_bitmap).astype(int) * 3
     else:
-        df["Pain_Penalty"] = 0
+        pain_penalty = 0
 
     # Final match score and percentage
-    df["Match_Score"] = (df["Base_Score"] + df["Weight_Bonus"] + df["Run_Goal_Bonus"] - df["Pain_Penalty"]).clip(lower=0)
-    df["Match_Percentage"] = ((df["Match_Score"] / 15.0) * 100).round(0)
+    match_score = np.clip(base_score + weight_bonus + run_goal_bonus - pain_penalty, 0, None)
+    match_percentage = np.round((match_score / 15.0) * 100, 0)
 
     # ===========================================
     # AGGREGATE RESULTS
     # ===========================================
     
-    recommendations = (
-        df.groupby(trainer_col)
-        .agg(
-            Avg_Score=('Score', 'mean'),
-            Num_Reviews=('Score', 'count'),
-            Match_Percentage=('Match_Percentage', 'mean')
-        )
-        .reset_index()
-        .rename(columns={trainer_col: "Trainer Model"})
-        .sort_values(by=['Match_Percentage', 'Avg_Score'], ascending=[False, False])
+    recommendations = aggregate_by_trainer(
+        arrays["trainer_codes"][selected],
+        arrays["trainer_names"],
+        arrays["score"][selected],
+        match_percentage,
     )
+    total = len(recommendations)
+    end = None if limit is None else offset + limit
+    page = top_trainers(
+        recommendations["Match_Percentage"].to_numpy(), recommendations["Avg_Score"].to_numpy(), end
+    )[offset:]
+    recommendations = recommendations.iloc[page]
     
     # Round for display
     recommendations['Avg_Score'] = recommendations['Avg_Score'].round(1)
@@ -309,15 +370,46 @@ def get_recommendations(run_goal, run_type, terrain, foot_width=None, weight=Non
     
     recommendations.attrs["strategy_used"] = strategy_used
     recommendations.attrs["cautions"] = cautions
+    recommendations.attrs["total"] = total
     if cautions:
-        print("INFO: " + " | ".join(cautions))
+        log("INFO: " + " | ".join(cautions))
 
-    print(f"\n[OK] Found {len(recommendations)} matching trainers:")
-    print(recommendations.to_string(index=False))
+    log(f"\n[OK] Found {total} matching trainers:")
+    if verbose:
+        log(recommendations.to_string(index=False))
     
     return recommendations
 
 
+def recommendations_payload(result):
+    """Turn get_recommendations output into the JSON-safe /recommendations response body"""
+    if result is None or (result.empty and not result.attrs.get("total")):
+        return {
+            "success": False,
+            "message": "No trainers found matching your criteria. Try broadening your search.",
+            "data": []
+        }
+    
+    # NaN/inf are left in place: services.serialization writes them as null
+    return {
+        "success": True,
+        "data": frame_records(result),
+        "count": len(result),
+        "total": result.attrs.get("total", len(result)),
+        "strategy_used": result.attrs.get("strategy_used", "exact_filters"),
+        "cautions": result.attrs.get("cautions", [])
+    }
+
+
+def paginate_payload(payload, limit=None, offset=0):
+    """One page of a full /recommendations response (responses without results are returned as they are)"""
+    if not payload.get("success") or (limit is None and not offset):
+        return payload
+    end = None if limit is None else offset + limit
+    data = payload["data"][offset:end]
+    return {**payload, "data": data, "count": len(data), "total": payload.get("total", len(payload["data"]))}
+
+
 # ===========================================
 # TEST
 # ===========================================
@@ -0,0 +1,82 @@
+import threading
+
+# Full Tally questions, for sheets where cleaning left the original header in place
+TRAINER_MODEL_COL_ALT = "What's the brand and model of this trainer? e.g. Nike Pegasus 40 or Adidas Adizero Pro 4"
+COMFORT_COL_ALT = "How would you rate the overall comfort of the trainer?"
+CUSHIONING_COL_ALT = "Please rate the cushioning of the trainer"
+RESPONSIVENESS_COL_ALT = "Please rate the responsiveness of the trainer (how quickly it adapts and returns energy with each step)"
+
+# Logical column -> lookup rules, tried in order. A string is an exact header; a tuple of keywords matches
+# the first header (lower-cased) containing all of them.
+SCHEMA_RULES = {
+    "submission_id": ["Submission ID", ("submission", "id")],
+    "trainer": ["Trainer Model", TRAINER_MODEL_COL_ALT, ("brand", "model")],
+    "run_type": ["Run Type", ("run", "type"), "Type of Run"],
+    "terrain": ["Terrain", ("terrain",)],
+    "foot_width": ["Foot Width", ("foot", "width")],
+    "weight": ["Weight", ("weight",)],
+    "pain": ["Pain Experienced", ("pain", "discomfort"), ("pain",), ("discomfort",)],
+    "comfort": [COMFORT_COL_ALT, "Comfort", ("comfort",)],
+    "cushioning": [CUSHIONING_COL_ALT, "Cushioning", ("cushioning",)],
+    "responsiveness": [RESPONSIVENESS_COL_ALT, "Responsiveness", ("responsiveness",)],
+    "five_k": ["Average 5k Time", ("average", "5k", "time"), "Average 5K Time"],
+    # Added by the typed frame (analysis/typed_frame.py)
+    "five_k_minutes": ["5k Minutes"],
+    "five_k_bucket": ["5k Bucket"],
+    "score": ["Score"],
+    "name": ["Name", ("what shall we call you",)],
+    "distance": ["Total Distance", "Distance in Trainers (km)", ("distance", "trainer")],
+    "post_run_feel": ["Post Run Feel", ("post", "run", "feel")],
+    "improvement_suggestions": ["Improvement Suggestions", ("improvement", "suggestion")],
+}
+
+# Free-text feedback columns (sentiment and keyword analysis), with the clean names used in messages
+TEXT_FIELDS = {
+    "post_run_feel": "Post Run Feel",
+    "pain": "Pain Experienced",
+    "improvement_suggestions": "Improvement Suggestions",
+}
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def _resolve(headers, lowered, rules):
+    for rule in rules:
+        if isinstance(rule, str):
+            if rule in headers:
+                return rule
+            continue
+        for col, col_lower in zip(headers, lowered):
+            if all(keyword in col_lower for keyword in rule):
+                return col
+    return None
+
+
+def resolve_schema(headers):
+    """Resolve every logical column against a header row: {logical name: actual header or None}"""
+    headers = list(headers)
+    lowered = [str(col).lower() for col in headers]
+    return {name: _resolve(headers, lowered, rules) for name, rules in SCHEMA_RULES.items()}
+
+
+def schema_for(df):
+    """Schema for a DataFrame, resolved once per distinct header row (treat it as read-only)"""
+    key = tuple(df.columns)
+    with _schemas_lock:
+        schema = _schemas.get(key)
+    if schema is None:
+        schema = resolve_schema(key)
+        with _schemas_lock:
+            _schemas[key] = schema
+    return schema
+
+
+def get_schema(snapshot):
+    """Schema of a data snapshot, resolved once per snapshot"""
+    return snapshot.derive("schema", lambda df: schema_for(df))
+
+
+def text_columns(schema):
+    """(clean name, actual header or None) for each free-text feedback column"""
+    return [(label, schema[field]) for field, label in TEXT_FIELDS.items()]
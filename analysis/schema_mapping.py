@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+from config.settings import SCHEMA_MAPPING_FILE
+
+# Define column mapping with more specific patterns
+# Order matters - more specific patterns should come first
+COLUMN_PATTERNS = [
+    # Exact or very specific matches first
+    (r'^.*submission.*id.*$', "Submission ID", False),
+    (r'^.*submitted.*at.*$', "Submitted at", False),
+    (r'^.*name.*$', "Name", False),
+    (r'^.*what.*gender.*do.*you.*identify.*with.*\?$', "Gender", False),  # Main gender question
+    (r'^.*foot.*width.*$', "Foot Width", False),
+    (r'^.*trainer.*model.*$', "Trainer Model", False),  # Column K
+    (r'^.*run.*type.*$', "Run Type", False),
+    (r'^.*distance.*trainer.*km.*$', "Total Distance", False),
+    (r'^.*distance.*trainer.*$', "Total Distance", False),
+    (r'^.*terrain.*$', "Terrain", False),
+    (r'^.*months.*wear.*$', "Months Wearing", False),
+    (r'^.*post.*run.*feel.*$', "Post Run Feel", False),
+    (r'^.*pain.*experience.*$', "Pain Experienced", False),
+    (r'^.*more.*information.*$', "More Information", False),  # Column S
+    (r'^.*comfort.*rating.*$', "Comfort Rating", False),
+    (r'^.*cushioning.*rating.*$', "Cushioning Rating", False),
+    (r'^.*responsiveness.*rating.*$', "Responsiveness Rating", False),
+    (r'^.*easy.*run.*pace.*$', "Easy Run Pace", False),
+    (r'^.*average.*5k.*race.*time.*minutes.*$', None, True),  # Drop this duplicate
+    (r'^.*average.*5k.*time.*$', "Average 5k Time", False),
+    (r'^.*5k.*time.*$', "Average 5k Time", False),
+    (r'^.*improvement.*suggestion.*$', "Improvement Suggestions", False),
+    (r'^.*magic.*wand.*change.*one.*thing.*$', None, True),  # Drop this duplicate
+    (r'^.*how.*do.*your.*trainers.*feel.*after.*typical.*run.*$', None, True),  # Drop this duplicate
+    (r'^.*would.*you.*recommend.*trainer.*friend.*\?.*$', "Would Recommend", False),
+    (r'^.*would.*recommend.*$', "Would Recommend", False),
+    (r'^.*score.*$', "Score", False),
+]
+
+# Columns to exclude from mapping (these will be dropped)
+EXCLUDE_PATTERNS = [
+    r'respondent.*id',
+    r'gender.*male',
+    r'gender.*female',
+    r'gender.*non-binary',
+    r'gender.*prefer.*not',
+    r'recommend.*yes',
+    r'recommend.*no',
+    r'recommend.*depends',
+]
+
+# Bump when the matching logic below changes, so persisted mappings are recomputed
+MAPPING_LOGIC_VERSION = 1
+
+# Each pattern compiled once; plus one combined alternation that finds the first matching pattern in a single
+# search. All patterns are ^-anchored, so the combined search can only match at position 0, where the
+# alternatives are tried in list order - exactly like trying the patterns one by one.
+_COMPILED_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern, _, _ in COLUMN_PATTERNS]
+_COMBINED_PATTERN = re.compile(
+    "|".join(f"(?P<p{i}>{pattern})" for i, (pattern, _, _) in enumerate(COLUMN_PATTERNS)),
+    re.IGNORECASE,
+)
+_EXCLUDE_PATTERN = re.compile("|".join(f"(?:{pattern})" for pattern in EXCLUDE_PATTERNS), re.IGNORECASE)
+
+_PATTERNS_FINGERPRINT = hashlib.sha1(
+    json.dumps([COLUMN_PATTERNS, EXCLUDE_PATTERNS, MAPPING_LOGIC_VERSION]).encode("utf-8")
+).hexdigest()
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _first_match(col_lower, start=0):
+    """Index of the first pattern (from start) matching a lower-cased header, or None"""
+    if start == 0:
+        match = _COMBINED_PATTERN.search(col_lower)
+        return int(match.lastgroup[1:]) if match else None
+    for i in range(start, len(_COMPILED_PATTERNS)):
+        if _COMPILED_PATTERNS[i].search(col_lower):
+            return i
+    return None
+
+
+def build_column_mapping(headers):
+    """Map raw Tally headers to clean names.
+
+    Returns {"mapping": {raw header: clean name}, "dropped": [...duplicates to drop],
+    "excluded": [...checkbox/ID columns to drop], "unmatched": [...headers left as they are]}
+    """
+    mapping = {}
+    dropped = []
+    excluded = []
+    unmatched = []
+    matched_clean_names = set()  # Track which clean names we've already mapped
+    
+    for col in headers:
+        col_lower = str(col).lower().strip()
+        
+        # Skip if should be excluded
+        if _EXCLUDE_PATTERN.search(col_lower):
+            excluded.append(col)
+            continue
+        
+        # Skip if already mapped
+        if col in mapping:
+            continue
+        
+        # First matching pattern wins; a pattern whose clean name is already taken passes to the next one
+        i = _first_match(col_lower)
+        while i is not None:
+            _, clean_name, should_drop = COLUMN_PATTERNS[i]
+            if should_drop or clean_name is None:
+                dropped.append(col)
+                break
+            if clean_name not in matched_clean_names:
+                mapping[col] = clean_name
+                matched_clean_names.add(clean_name)
+                break
+            i = _first_match(col_lower, i + 1)
+        
+        if i is None:
+            unmatched.append(col)
+    
+    return {"mapping": mapping, "dropped": dropped, "excluded": excluded, "unmatched": unmatched}
+
+
+def headers_key(headers):
+    """Stable key for a header row (and the current patterns)"""
+    return hashlib.sha1(json.dumps([_PATTERNS_FINGERPRINT, list(headers)]).encode("utf-8")).hexdigest()
+
+
+def _load_persisted(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_column_mapping(headers, path=None):
+    """Column mapping for a header row, memoized in-process and on disk so an unchanged form skips matching"""
+    path = path or SCHEMA_MAPPING_FILE
+    key = headers_key(headers)
+    with _memo_lock:
+        if key in _memo:
+            return _memo[key]
+        persisted = _load_persisted(path)
+        if key in persisted:
+            _memo[key] = persisted[key]
+            return persisted[key]
+        
+        result = build_column_mapping(headers)
+        _memo[key] = result
+        persisted[key] = result
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(persisted, f, indent=2)
+        except OSError as e:
+            print(f"Warning: could not persist column mapping: {e}")
+        return result
@@ -1,39 +1,36 @@
-print("=== SCORING MODULE LOADED ===")
 import pandas as pd
 from datetime import datetime
-from services.sheets_service import SheetsService
+from services.storage import get_storage
+from analysis.schema import schema_for
 from config.settings import SHEET_CLEAN_DATA, SHEET_QUANT_ANALYSIS
 
-def assign_score_tiers():
+def assign_score_tiers(sheets=None, df=None):
     """Assign segmentation tiers based on scores"""
     print("Starting score tier assignment...")
     
-    sheets = SheetsService()
+    sheets = sheets or get_storage()
     
-    # Read clean data
-    df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
+    # Read clean data (or use the frame the pipeline shares; it is never modified here)
+    if df is None:
+        df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
     
     # Resolve name column (cleaning may leave Tally question as header; sheet may add newline/spaces)
-    name_col = None
-    if "Name" in df.columns:
-        name_col = "Name"
-    else:
-        for col in df.columns:
-            if "what shall we call you" in str(col).lower().strip():
-                name_col = col
-                break
+    schema = schema_for(df)
+    name_col = schema["name"]
+    score_col = schema["score"]
     if name_col is None:
         print("Error: Name column not found (expected 'Name' or a column containing 'what shall we call you')")
         return None
-    if "Score" not in df.columns:
+    if score_col is None:
         print("Error: 'Score' column not found")
         return None
 
-    # Convert Score to numeric
-    df['Score'] = pd.to_numeric(df['Score'], errors='coerce')
+    # Score is already numeric (float64) in the snapshot
+    scores = pd.to_numeric(df[score_col], errors='coerce').astype(float)
     
     # Drop rows with missing scores
-    df.dropna(subset=['Score'], inplace=True)
+    scored = scores.notna()
+    scores = scores[scored]
     
     # Assign tier
     def assign_tier(score):
@@ -44,12 +41,13 @@ def assign_score_tiers():
         else:
             return "High"
     
-    df['Segmentation Tier'] = df['Score'].apply(assign_tier)
-    df['Timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Select columns to write (use name_col for reading, output as "Name")
-    output_df = df[[name_col, "Score", "Segmentation Tier", "Timestamp"]].copy()
-    output_df.rename(columns={name_col: "Name"}, inplace=True)
+    # Columns to write (use name_col for reading, output as "Name")
+    output_df = pd.DataFrame({
+        "Name": df.loc[scored, name_col],
+        "Score": scores,
+        "Segmentation Tier": scores.apply(assign_tier),
+        "Timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
     
     # Write to Quant Analysis sheet
     sheets.write_dataframe(SHEET_QUANT_ANALYSIS, output_df, clear_first=False)
@@ -1,57 +1,62 @@
 import pandas as pd
-from textblob import TextBlob
 from datetime import datetime
-from services.sheets_service import SheetsService
+from services.storage import get_storage
+from analysis.schema import schema_for, text_columns
+from analysis.text_features import get_text_features
+from analysis.typed_frame import plain_columns
 from config.settings import SHEET_CLEAN_DATA, SHEET_SENTIMENT
 
-def analyze_sentiment():
+def analyze_sentiment(sheets=None, df=None):
     """Analyze sentiment from qualitative feedback"""
     print("Analyzing sentiment...")
     
-    sheets = SheetsService()
+    sheets = sheets or get_storage()
     
-    # Read clean data
-    df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
+    # Read clean data (or use the frame the pipeline shares; it is never modified here)
+    if df is None:
+        df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
     
-    # Text columns to analyze
-    text_cols = ["Post Run Feel", "Pain Experienced", "Improvement Suggestions"]
+    # Text columns to analyze (clean name, actual header)
+    schema = schema_for(df)
+    text_fields = text_columns(schema)
+    text_cols = [label for label, _ in text_fields]
+    trainer_col = schema["trainer"]
     
-    # Sentiment analysis function
-    def get_sentiment(text):
-        blob = TextBlob(str(text))
-        return blob.sentiment.polarity, blob.sentiment.subjectivity
-    
-    # Apply sentiment analysis to each text column
-    for col in text_cols:
-        if col in df.columns:
-            df[f"{col} Polarity"] = df[col].apply(lambda x: get_sentiment(x)[0])
-            df[f"{col} Subjectivity"] = df[col].apply(lambda x: get_sentiment(x)[1])
+    # Per-review polarity and subjectivity from the text feature store (new answers are scored once)
+    sentiment = pd.DataFrame(index=df.index)
+    features = get_text_features(df, [(col, source_col) for col, source_col in text_fields if source_col is not None])
+    for col, source_col in text_fields:
+        if source_col is not None:
+            sentiment[f"{col} Polarity"] = features[col]["polarity"]
+            sentiment[f"{col} Subjectivity"] = features[col]["subjectivity"]
         else:
             print(f"Warning: Column '{col}' not found")
-            df[f"{col} Polarity"] = None
-            df[f"{col} Subjectivity"] = None
+            sentiment[f"{col} Polarity"] = None
+            sentiment[f"{col} Subjectivity"] = None
     
     # Calculate overall sentiment
-    sentiment_polarity_cols = [f"{c} Polarity" for c in text_cols if f"{c} Polarity" in df.columns]
-    sentiment_subjectivity_cols = [f"{c} Subjectivity" for c in text_cols if f"{c} Subjectivity" in df.columns]
+    sentiment_polarity_cols = [f"{c} Polarity" for c in text_cols if f"{c} Polarity" in sentiment.columns]
+    sentiment_subjectivity_cols = [f"{c} Subjectivity" for c in text_cols if f"{c} Subjectivity" in sentiment.columns]
     
     if sentiment_polarity_cols:
-        df["Overall Polarity"] = df[sentiment_polarity_cols].mean(axis=1)
+        sentiment["Overall Polarity"] = sentiment[sentiment_polarity_cols].mean(axis=1)
     else:
-        df["Overall Polarity"] = None
+        sentiment["Overall Polarity"] = None
     
     if sentiment_subjectivity_cols:
-        df["Overall Subjectivity"] = df[sentiment_subjectivity_cols].mean(axis=1)
+        sentiment["Overall Subjectivity"] = sentiment[sentiment_subjectivity_cols].mean(axis=1)
     else:
-        df["Overall Subjectivity"] = None
+        sentiment["Overall Subjectivity"] = None
     
     # Aggregate by trainer model
-    if 'Overall Polarity' in df.columns and 'Overall Subjectivity' in df.columns and 'Trainer Model' in df.columns:
+    if 'Overall Polarity' in sentiment.columns and 'Overall Subjectivity' in sentiment.columns and trainer_col is not None:
         sentiment_summary = (
-            df[["Trainer Model", "Overall Polarity", "Overall Subjectivity"]]
-            .groupby("Trainer Model")
+            sentiment[["Overall Polarity", "Overall Subjectivity"]]
+            .groupby(df[trainer_col], observed=True)
             .mean()
             .reset_index()
+            .rename(columns={trainer_col: "Trainer Model"})
+            .pipe(plain_columns)
         )
         
         # Write to Sentiment Analysis sheet
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+
+from analysis.schema import schema_for
+from config.settings import TEXT_FEATURE_STORE_FILE, TEXT_FEATURE_WORKERS, TEXT_FEATURE_PARALLEL_MIN_TEXTS
+
+# Bump when tokenization, lemmatization or sentiment scoring changes, so stored features are recomputed
+FEATURE_LOGIC_VERSION = 1
+
+FEATURE_COLUMNS = ["tokens", "lemmas", "polarity", "subjectivity"]
+
+
+def load_nltk():
+    """Import NLTK and make sure its corpora are available (downloaded on first use, not at import)"""
+    import nltk
+
+    for resource, package in (
+        ('tokenizers/punkt', 'punkt'),
+        ('corpora/stopwords', 'stopwords'),
+        ('corpora/wordnet', 'wordnet'),
+    ):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package)
+    return nltk
+
+
+def text_hash(text):
+    """Content hash of an answer, tied to the feature logic that processes it"""
+    return hashlib.sha1(f"{FEATURE_LOGIC_VERSION}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def process_pool(workers):
+    """Process pool for CPU-bound text work. Workers are started from a fork server (spawned where there is
+    none), never forked from this process: the pipeline runs analyses on threads next to stages holding
+    gspread/HTTP locks, and a fork would copy those locks into the children held."""
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def _compute_features(texts):
+    """(tokens, lemmas, polarity, subjectivity) of each text: NLTK word tokens of the lower-cased text,
+    their WordNet lemmas, and the TextBlob sentiment of the text as written (one TextBlob per text)"""
+    from textblob import TextBlob
+
+    nltk = load_nltk()
+    word_tokenize = nltk.tokenize.word_tokenize
+    lemmatize = nltk.stem.WordNetLemmatizer().lemmatize
+    features = []
+    for text in texts:
+        tokens = tuple(word_tokenize(text.lower()))
+        sentiment = TextBlob(text).sentiment
+        features.append((tokens, tuple(lemmatize(token) for token in tokens), sentiment.polarity, sentiment.subjectivity))
+    return features
+
+
+def compute_features(texts, workers=TEXT_FEATURE_WORKERS, min_parallel=TEXT_FEATURE_PARALLEL_MIN_TEXTS):
+    """Features of a list of distinct texts, split across a process pool when there are at least `min_parallel`"""
+    if workers <= 1 or len(texts) < min_parallel:
+        return _compute_features(texts)
+    # Make sure the corpora are downloaded once, before the workers look for them
+    load_nltk()
+    chunk_size = -(-len(texts) // (workers * 4))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with process_pool(workers) as pool:
+        return [features for chunk in pool.map(_compute_features, chunks) for features in chunk]
+
+
+class TextFeatureStore:
+    """Per-review text features kept in a local SQLite file, keyed by (Submission ID, column, text hash)"""
+
+    def __init__(self, path=TEXT_FEATURE_STORE_FILE):
+        self.path = path
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS text_features ("
+                "submission_id TEXT NOT NULL, column_name TEXT NOT NULL, text_hash TEXT NOT NULL, "
+                "tokens TEXT NOT NULL, lemmas TEXT NOT NULL, polarity REAL NOT NULL, subjectivity REAL NOT NULL, "
+                "PRIMARY KEY (submission_id, column_name, text_hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS text_features_hash ON text_features (text_hash)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, column_names, hashes):
+        """Stored (submission_id, column, text_hash) keys for these columns, plus {text_hash: features}, for the
+        given text hashes only (features only depend on the text, so any review's copy can be reused)"""
+        placeholders = ", ".join("?" * len(column_names))
+        with self._connect() as conn:
+            # Joined against the wanted hashes, so a run reads what its frame needs rather than the whole store
+            conn.execute("CREATE TEMP TABLE wanted (text_hash TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((digest,) for digest in hashes))
+            keys = set(conn.execute(
+                "SELECT submission_id, column_name, text_hash FROM wanted JOIN text_features USING (text_hash) "
+                f"WHERE column_name IN ({placeholders})",
+                list(column_names),
+            ))
+            rows = conn.execute(
+                "SELECT text_hash, tokens, lemmas, polarity, subjectivity "
+                "FROM wanted JOIN text_features USING (text_hash) GROUP BY text_hash"
+            ).fetchall()
+        features = {
+            digest: (tuple(json.loads(tokens)), tuple(json.loads(lemmas)), polarity, subjectivity)
+            for digest, tokens, lemmas, polarity, subjectivity in rows
+        }
+        return keys, features
+
+    def save(self, rows):
+        """Store ((submission_id, column, text_hash), features) rows"""
+        with self._write_lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO text_features "
+                "(submission_id, column_name, text_hash, tokens, lemmas, polarity, subjectivity) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (*key, json.dumps(tokens), json.dumps(lemmas), polarity, subjectivity)
+                    for key, (tokens, lemmas, polarity, subjectivity) in rows
+                ),
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+# One feature update at a time, so analyses running side by side process each new answer once
+_update_lock = threading.Lock()
+
+
+def get_feature_store():
+    """The process-wide text feature store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TextFeatureStore()
+        return _store
+
+
+def get_text_features(df, fields, store=None):
+    """{column label: DataFrame of tokens, lemmas, polarity and subjectivity per row} for (label, column) text fields.
+
+    Every cell is read as str(cell) (missing answers as "nan"). Features come from the store; answers it hasn't
+    seen are computed once per distinct text and saved under their review's Submission ID.
+    """
+    if not fields:
+        return {}
+    store = store or get_feature_store()
+    id_col = schema_for(df)["submission_id"]
+    ids = df[id_col].astype(str).tolist() if id_col is not None else [""] * len(df)
+
+    keys_by_label = {}
+    texts_by_hash = {}
+    for label, col in fields:
+        texts = df[col].astype(str).tolist()
+        hashes = {text: text_hash(text) for text in dict.fromkeys(texts)}
+        keys_by_label[label] = [(submission_id, label, hashes[text]) for submission_id, text in zip(ids, texts)]
+        texts_by_hash.update((digest, text) for text, digest in hashes.items())
+
+    with _update_lock:
+        stored_keys, features = store.load([label for label, _ in fields], texts_by_hash)
+        new_texts = {digest: text for digest, text in texts_by_hash.items() if digest not in features}
+        if new_texts:
+            print(f"Computing text features for {len(new_texts)} new answers")
+            features.update(zip(new_texts, compute_features(list(new_texts.values()))))
+        new_keys = {key for keys in keys_by_label.values() for key in keys if key not in stored_keys}
+        if new_keys:
+            store.save((key, features[key[2]]) for key in new_keys)
+
+    return {
+        label: pd.DataFrame([features[key[2]] for key in keys], index=df.index, columns=FEATURE_COLUMNS)
+        for label, keys in keys_by_label.items()
+    }
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from analysis.schema import schema_for
+
+# Columns stored as pandas Categoricals (integer codes plus one copy of each distinct value)
+CATEGORICAL_FIELDS = ["trainer", "run_type", "terrain", "foot_width", "weight", "pain", "five_k"]
+
+# Numeric columns (unparseable cells become NaN). The 1-10 ratings fit float32 exactly; Score and Total Distance
+# can hold decimals like 7.3, which float32 would turn into 7.300000190734863 in averages and written sheets
+FLOAT32_FIELDS = ["comfort", "cushioning", "responsiveness"]
+FLOAT64_FIELDS = ["score", "distance"]
+
+# Added columns holding the Average 5k Time answer parsed to minutes, and its "sub N" bucket (0 = not a sub answer)
+FIVE_K_MINUTES_COL = "5k Minutes"
+FIVE_K_BUCKET_COL = "5k Bucket"
+
+
+def parse_5k_column(series):
+    """Parse Average 5k Time answers ('sub 25', '40 minutes', '45 mins', '50') in one vectorized pass.
+
+    Returns (minutes, bucket): minutes is the first number in the answer (float32, NaN if there is none);
+    bucket is that number for "sub N" answers and 0 otherwise (int16), so goal bonuses are integer lookups.
+    """
+    # Parse each distinct answer once; rows pick their values up by code
+    codes, uniques = pd.factorize(series)
+    normalized = pd.Series(uniques, dtype=object).astype(str).str.lower().str.strip()
+    minutes = pd.to_numeric(normalized.str.extract(r'(\d+)', expand=False), errors='coerce')
+    is_sub = normalized.str.contains("sub", regex=False)
+    bucket = minutes.where(is_sub, 0).fillna(0)
+
+    # Code -1 (missing cell) picks up the trailing NaN / 0
+    minutes = np.append(minutes.to_numpy(dtype=np.float32), np.float32("nan"))
+    bucket = np.append(bucket.to_numpy(dtype=np.int16), np.int16(0))
+    return minutes[codes], bucket[codes]
+
+
+def to_typed_frame(df):
+    """Typed copy of a Clean Live Data frame: categorical dropdown columns, numeric ratings/Score/distance,
+    parsed 5k minutes.
+
+    Display values are left as they are in the sheet; lower-casing happens once per category
+    (see normalized_codes) instead of once per row per request.
+    """
+    schema = schema_for(df)
+    typed = df.copy(deep=False)
+    for field in CATEGORICAL_FIELDS:
+        col = schema[field]
+        if col is not None:
+            typed[col] = typed[col].astype("category")
+    for fields, dtype in ((FLOAT32_FIELDS, np.float32), (FLOAT64_FIELDS, np.float64)):
+        for field in fields:
+            col = schema[field]
+            if col is not None:
+                typed[col] = pd.to_numeric(typed[col], errors='coerce').astype(dtype)
+    if schema["five_k"] is not None:
+        typed[FIVE_K_MINUTES_COL], typed[FIVE_K_BUCKET_COL] = parse_5k_column(typed[schema["five_k"]])
+    return typed
+
+
+def normalized_codes(series):
+    """Row codes and uniques of a column after lower-casing and stripping (same as factorizing the normalized strings)
+
+    Categorical columns only normalize their categories, so the work scales with distinct values, not rows.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.factorize(series.astype(str).str.lower().str.strip())
+
+    category_codes, uniques = pd.factorize(series.cat.categories.astype(str).str.lower().str.strip())
+    row_codes = series.cat.codes.to_numpy()
+    if (row_codes < 0).any():
+        # Missing cells read as "nan", like astype(str) on the plain column
+        missing = np.flatnonzero(uniques == "nan")
+        if len(missing) == 0:
+            uniques = np.append(uniques, "nan").astype(object)
+            missing = [len(uniques) - 1]
+        category_codes = np.append(category_codes, missing[0])
+    return category_codes[row_codes], np.asarray(uniques, dtype=object)
+
+
+def plain_columns(df):
+    """Same frame with categorical columns turned back into plain object columns (for output/fillna)"""
+    categorical = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    return df.astype({col: object for col in categorical}) if categorical else df
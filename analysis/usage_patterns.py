@@ -1,44 +1,57 @@
-print("=== USAGE PATTERNS MODULE LOADED ===")
 import pandas as pd
 from datetime import datetime
-from services.sheets_service import SheetsService
+from services.storage import get_storage
+from analysis.schema import schema_for
+from analysis.typed_frame import plain_columns
 from config.settings import SHEET_CLEAN_DATA, SHEET_USAGE_PATTERNS
 
-def analyze_usage_patterns():
+def analyze_usage_patterns(sheets=None, write=True, df=None):
     """Analyze usage patterns by trainer model"""
     print("Analyzing usage patterns...")
     
-    sheets = SheetsService()
+    sheets = sheets or get_storage()
     
-    # Read clean data
-    df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
+    # Read clean data (or use the frame the pipeline shares; it is never modified here)
+    if df is None:
+        df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
     
     if df.empty:
         print("Error: No data found in clean data sheet")
         return None
     
-    # Convert distance to numeric
-    if 'Distance in Trainers (km)' in df.columns:
-        df['Distance in Trainers (km)'] = pd.to_numeric(df['Distance in Trainers (km)'], errors='coerce')
+    schema = schema_for(df)
+    trainer_col = schema["trainer"]
+    distance_col = schema["distance"]
     
     # Helper function for most common value
     def most_common(series):
         return series.mode().iloc[0] if not series.mode().empty else None
     
     # Aggregate usage patterns
-    if 'Trainer Model' not in df.columns:
+    if trainer_col is None:
         print("Error: 'Trainer Model' column not found")
         return None
     
+    # Aggregates over columns this sheet doesn't have are left out
+    aggregations = {
+        "Most_Common_RunType": (schema["run_type"], most_common),
+        "Most_Common_Terrain": (schema["terrain"], most_common),
+        "Avg_Distance": (distance_col, "mean"),
+        "Respondents": (schema["name"] or trainer_col, "count"),
+    }
+    aggregations = {name: agg for name, agg in aggregations.items() if agg[0] is not None}
+    usage = df[list(dict.fromkeys([trainer_col] + [col for col, _ in aggregations.values()]))]
+    
+    # Convert distance to numeric
+    if distance_col is not None:
+        usage = usage.assign(**{distance_col: pd.to_numeric(usage[distance_col], errors='coerce').astype(float)})
+    
     usage_patterns = (
-        df.groupby("Trainer Model")
-        .agg(
-            Most_Common_RunType=("Run Type", most_common),
-            Most_Common_Terrain=("Terrain", most_common),
-            Avg_Distance=("Distance in Trainers (km)", "mean"),
-            Respondents=("Name", "count")
-        )
+        usage.groupby(trainer_col, observed=True)
+        .agg(**aggregations)
         .reset_index()
+        .rename(columns={trainer_col: "Trainer Model"})
+        .pipe(plain_columns)
         .sort_values(by="Respondents", ascending=False)
     )
     
@@ -49,7 +62,8 @@ def analyze_usage_patterns():
     usage_patterns = usage_patterns.fillna('')
     
     # Write to Usage Patterns sheet
-    sheets.write_dataframe(SHEET_USAGE_PATTERNS, usage_patterns)
+    if write:
+        sheets.write_dataframe(SHEET_USAGE_PATTERNS, usage_patterns)
     
     print("[OK] Usage patterns analysis complete")
     print("\n[PATTERNS] Usage Patterns:")
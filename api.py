@@ -1,17 +1,110 @@
+import asyncio
+import importlib
+import itertools
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
-import pandas as pd
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Analysis modules (pandas, NumPy) are imported inside the endpoints that use them, so the app
+# starts serving health checks without paying for them
+from services.storage import get_storage
+from services.snapshot_cache import snapshot_cache
+from services.result_cache import ResultCache
+from services.async_support import endpoint_limit, io_executor, run_compute, run_in
+from services.serialization import JSONBytesResponse, dumps, frame_records
+from config.settings import (
+    SHEET_CLEAN_DATA,
+    RECOMMENDATION_CACHE_SIZE,
+    RECOMMENDATION_CACHE_TTL_SECONDS,
+    PRECOMPUTE_RECOMMENDATIONS_ON_REFRESH,
+    WARMUP_ON_STARTUP,
+    WARMUP_PRECOMPUTE_ANALYSES,
+    WARMUP_RETRY_SECONDS,
+)
+
+# Serialized /recommendations responses, keyed by normalized inputs + page and reset whenever Clean Live Data changes
+recommendation_cache = ResultCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL_SECONDS)
+
+# Serialized /leaderboard and /usage-patterns responses for the current Clean Live Data version
+analysis_cache = ResultCache(2, RECOMMENDATION_CACHE_TTL_SECONDS)
+
+# Whole-dataset analyses served as-is: name -> (module, function, message when there's no data)
+ANALYSIS_RESPONSES = {
+    "leaderboard": ("analysis.leaderboard", "create_leaderboard", "No leaderboard data available"),
+    "usage-patterns": ("analysis.usage_patterns", "analyze_usage_patterns", "No usage patterns data available"),
+}
+
+
+async def _analysis_response(name, sheets):
+    """Serialized response of a whole-dataset analysis, computed once per Clean Live Data version"""
+    # Load (or reuse) the snapshot off the event loop, then compute from that same (read-only) frame without
+    # touching the output sheet, so the response is cached under the version it was computed from
+    snapshot = await sheets.aget_snapshot(SHEET_CLEAN_DATA)
+    cached = analysis_cache.get(name, snapshot.version)
+    if cached is not None:
+        return cached
+    module, function, empty_message = ANALYSIS_RESPONSES[name]
+    analyze = getattr(importlib.import_module(module), function)
+    async with endpoint_limit(name):
+        result = await run_compute(analyze, sheets, write=False, df=snapshot.df)
+    if result is None or result.empty:
+        return dumps({"error": empty_message})
+    body = dumps({"success": True, "data": frame_records(result)})
+    analysis_cache.set(name, snapshot.version, body)
+    return body
+
+
+# Startup warm-up progress, reported by /ready: "warming" until Clean Live Data and its indexes are loaded
+warmup_state = {"status": "warming", "seconds": None, "error": None}
 
-# Import your analysis functions
-from analysis.leaderboard import create_leaderboard
-from analysis.usage_patterns import analyze_usage_patterns
-from analysis.recommendations import get_recommendations
-from services.sheets_service import SheetsService
-from config.settings import SHEET_CLEAN_DATA
 
-app = FastAPI(title="Trainer Recommendation API")
+async def warm_up():
+    """Preload what the first requests would otherwise pay for: credentials, the Clean Live Data download,
+    typing, recommendation indexes (and the table), optionally the leaderboard and usage patterns"""
+    from analysis.recommendations import warm_indexes
+    from analysis.recommendation_table import ensure_recommendation_table
+
+    started = time.monotonic()
+    while True:
+        try:
+            sheets = get_storage()
+            snapshot = await sheets.aget_snapshot(SHEET_CLEAN_DATA)
+            await run_compute(warm_indexes, snapshot)
+            await run_in(io_executor, ensure_recommendation_table, snapshot, build=PRECOMPUTE_RECOMMENDATIONS_ON_REFRESH)
+            if WARMUP_PRECOMPUTE_ANALYSES:
+                for name in ANALYSIS_RESPONSES:
+                    await _analysis_response(name, sheets)
+            break
+        except Exception as e:
+            warmup_state["error"] = str(e)
+            print(f"Warm-up failed, retrying in {WARMUP_RETRY_SECONDS:.0f}s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    warmup_state.update(status="ready", seconds=round(time.monotonic() - started, 3), error=None)
+    print(f"[OK] Warm-up complete in {warmup_state['seconds']}s")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background: the process accepts connections (and answers /) straight away,
+    # while /ready holds load-balancer traffic until the caches are built
+    if not WARMUP_ON_STARTUP:
+        warmup_state["status"] = "ready"
+        yield
+        return
+    task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+# Every response is serialized with orjson (NaN/inf -> null); endpoints hand back JSONBytesResponse directly
+# to skip FastAPI's jsonable_encoder pass
+app = FastAPI(title="Trainer Recommendation API", default_response_class=JSONBytesResponse, lifespan=lifespan)
 
 # Enable CORS so your React frontend can call this API
 app.add_middleware(
@@ -30,51 +123,48 @@ class RecommendationRequest(BaseModel):
     weight: str  # e.g., "Between 65kg - 85kg"
     foot_width: Optional[str] = None  # e.g., "Narrow", "Regular", "Wide"
     pain: Optional[str] = None  # e.g., "knee pain"
+    limit: Optional[int] = Field(None, ge=1)  # page size (all matching trainers if omitted)
+    offset: int = Field(0, ge=0)  # trainers to skip from the top of the ranking
 
 @app.get("/")
-def root():
+async def root():
     """Health check endpoint"""
     return {"status": "API is running", "message": "Trainer Recommendation API"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness check: 503 until the startup warm-up has loaded the data and built the caches"""
+    return JSONBytesResponse(warmup_state, status_code=200 if warmup_state["status"] == "ready" else 503)
+
 @app.get("/leaderboard")
-def get_leaderboard():
+async def get_leaderboard():
     """Get top 5 trainers leaderboard"""
     try:
-        result = create_leaderboard()
-        if result is None or result.empty:
-            return {"error": "No leaderboard data available"}
-        
-        # Convert DataFrame to dict for JSON response
-        return {
-            "success": True,
-            "data": result.to_dict(orient='records')
-        }
+        return JSONBytesResponse(await _analysis_response("leaderboard", get_storage()))
     except Exception as e:
-        return {"error": str(e)}
+        return JSONBytesResponse({"error": str(e)})
 
 @app.get("/usage-patterns")
-def get_usage_patterns():
+async def get_usage_patterns():
     """Get usage patterns for all trainers"""
     try:
-        result = analyze_usage_patterns()
-        if result is None or result.empty:
-            return {"error": "No usage patterns data available"}
-        
-        return {
-            "success": True,
-            "data": result.to_dict(orient='records')
-        }
+        return JSONBytesResponse(await _analysis_response("usage-patterns", get_storage()))
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         print(f"ERROR in usage-patterns: {error_details}")
-        return {"error": str(e), "details": error_details}
+        return JSONBytesResponse({"error": str(e), "details": error_details})
 
 @app.post("/recommendations")
-def get_trainer_recommendations(request: RecommendationRequest):
+async def get_trainer_recommendations(request: RecommendationRequest):
     """Get personalized trainer recommendations based on user inputs"""
     try:
-        result = get_recommendations(
+        from analysis.recommendations import (
+            get_recommendations, normalize_request, paginate_payload, recommendations_payload,
+        )
+        from analysis.recommendation_table import ensure_recommendation_table, lookup_recommendations
+
+        params = normalize_request(
             run_goal=request.run_goal,
             run_type=request.run_type,
             terrain=request.terrain,
@@ -82,44 +172,109 @@ def get_trainer_recommendations(request: RecommendationRequest):
             weight=request.weight,
             pain=request.pain
         )
+        page = (request.limit, request.offset)
+        snapshot = await get_storage().aget_snapshot(SHEET_CLEAN_DATA)
+        cached = recommendation_cache.get(params + page, snapshot.version)
+        if cached is not None:
+            return JSONBytesResponse(cached)
         
-        if result is None or result.empty:
-            return {
-                "success": False,
-                "message": "No trainers found matching your criteria. Try broadening your search.",
-                "data": []
-            }
-        
-        # Replace NaN/inf before JSON serialization to avoid 500 errors
-        safe_result = result.copy()
-        safe_result = safe_result.replace([float("inf"), float("-inf")], pd.NA)
-        safe_result = safe_result.astype(object).where(pd.notnull(safe_result), None)
-
-        return {
-            "success": True,
-            "data": safe_result.to_dict(orient='records'),
-            "count": len(safe_result),
-            "strategy_used": safe_result.attrs.get("strategy_used", "exact_filters"),
-            "cautions": safe_result.attrs.get("cautions", [])
-        }
+        # Dropdown-only requests come straight from the precomputed table; free text falls back to the live engine
+        await run_in(io_executor, ensure_recommendation_table, snapshot, build=PRECOMPUTE_RECOMMENDATIONS_ON_REFRESH)
+        response = lookup_recommendations(params, snapshot.version)
+        if response is not None:
+            response = paginate_payload(response, *page)
+        else:
+            async with endpoint_limit("recommendations"):
+                result = await run_compute(
+                    get_recommendations, *params, snapshot=snapshot, limit=request.limit, offset=request.offset
+                )
+            response = recommendations_payload(result)
+        body = dumps(response)
+        recommendation_cache.set(params + page, snapshot.version, body)
+        return JSONBytesResponse(body)
     except Exception as e:
-        return {"error": str(e)}
+        return JSONBytesResponse({"error": str(e)})
+
+# Profiles scored and encoded per trip to the compute pool while streaming a batch
+BATCH_LINES_PER_STEP = 200
+
+
+def _next_batch_lines(results, start):
+    """Encode the next NDJSON lines of a batch response (empty once every profile has been sent)"""
+    lines = [
+        dumps({"index": start + offset, **payload}) + b"\n"
+        for offset, payload in enumerate(itertools.islice(results, BATCH_LINES_PER_STEP))
+    ]
+    return b"".join(lines), len(lines)
+
+@app.post("/recommendations/batch")
+async def get_batch_trainer_recommendations(requests: List[RecommendationRequest]):
+    """Recommendations for many runner profiles against one snapshot, streamed as NDJSON (one line per profile, in order)"""
+    from analysis.recommendations import normalize_request
+    from analysis.batch_recommendations import iter_batch_recommendations
+
+    profiles = [
+        normalize_request(
+            run_goal=request.run_goal,
+            run_type=request.run_type,
+            terrain=request.terrain,
+            foot_width=request.foot_width,
+            weight=request.weight,
+            pain=request.pain
+        )
+        for request in requests
+    ]
+    pages = [(request.limit, request.offset) for request in requests]
+    snapshot = await get_storage().aget_snapshot(SHEET_CLEAN_DATA)
+    results = iter_batch_recommendations(profiles, snapshot, pages)
+
+    async def stream():
+        sent = 0
+        try:
+            while True:
+                async with endpoint_limit("recommendations-batch"):
+                    body, count = await run_compute(_next_batch_lines, results, sent)
+                if not count:
+                    return
+                sent += count
+                yield body
+        except Exception as e:
+            yield dumps({"index": sent, "error": str(e)}) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def _database_stats(snapshot):
+    from analysis.schema import get_schema
+
+    df = snapshot.df
+    schema = get_schema(snapshot)
+    trainer_col, run_type_col, terrain_col = schema["trainer"], schema["run_type"], schema["terrain"]
+    return {
+        "total_reviews": len(df),
+        "unique_trainers": df[trainer_col].nunique() if trainer_col is not None else 0,
+        "run_types": df[run_type_col].value_counts().to_dict() if run_type_col is not None else {},
+        "terrains": df[terrain_col].value_counts().to_dict() if terrain_col is not None else {}
+    }
 
 @app.get("/stats")
-def get_stats():
+async def get_stats():
     """Get overall database statistics"""
     try:
-        sheets = SheetsService()
-        df = sheets.read_to_dataframe(SHEET_CLEAN_DATA)
-        
-        return {
-            "total_reviews": len(df),
-            "unique_trainers": df['Trainer Model'].nunique() if 'Trainer Model' in df.columns else 0,
-            "run_types": df['Run Type'].value_counts().to_dict() if 'Run Type' in df.columns else {},
-            "terrains": df['Terrain'].value_counts().to_dict() if 'Terrain' in df.columns else {}
-        }
+        snapshot = await get_storage().aget_snapshot(SHEET_CLEAN_DATA)
+        async with endpoint_limit("stats"):
+            return JSONBytesResponse(await run_compute(_database_stats, snapshot))
     except Exception as e:
-        return {"error": str(e)}
+        return JSONBytesResponse({"error": str(e)})
+
+@app.get("/metrics")
+async def get_metrics():
+    """Cache counters for monitoring"""
+    return JSONBytesResponse({
+        "recommendation_cache": recommendation_cache.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        # calls = Sheets fetches actually made, collapsed = concurrent reads that joined one of them
+        "sheet_fetches": snapshot_cache.fetches.stats()
+    })
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,3 +1,5 @@
+import os
+
 # Google Sheets Configuration
 SPREADSHEET_NAME = "The Perfect Shoe Project"
 
@@ -19,4 +21,82 @@ SCOPES = [
 ]
 
 # Credentials file path
-CREDENTIALS_FILE = "credentials.json"
\ No newline at end of file
+CREDENTIALS_FILE = "credentials.json"
+
+# Snapshot cache: seconds a downloaded sheet is served before it is refreshed in the background
+SNAPSHOT_TTL_SECONDS = float(os.getenv("SNAPSHOT_TTL_SECONDS", "300"))
+
+# Max pooled HTTP connections kept open to the Sheets API by the shared client
+SHEETS_HTTP_POOL_SIZE = int(os.getenv("SHEETS_HTTP_POOL_SIZE", "10"))
+
+# /recommendations response cache: max entries kept (LRU) and seconds before an entry expires
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "600"))
+
+# Local cache directory for build artifacts (precomputed tables, state files)
+CACHE_DIR = os.getenv("TRAINER_CACHE_DIR", ".cache")
+RECOMMENDATION_TABLE_FILE = os.path.join(CACHE_DIR, "recommendation_table.json")
+
+# Build the precomputed recommendation table in the API process whenever Clean Live Data changes
+PRECOMPUTE_RECOMMENDATIONS_ON_REFRESH = os.getenv("PRECOMPUTE_RECOMMENDATIONS_ON_REFRESH", "0") == "1"
+
+# API startup warm-up: load Clean Live Data and build the recommendation indexes before /ready reports ready,
+# optionally precomputing the leaderboard and usage-pattern responses; failed warm-ups retry after a delay
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+WARMUP_PRECOMPUTE_ANALYSES = os.getenv("WARMUP_PRECOMPUTE_ANALYSES", "1") == "1"
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+
+# API concurrency: threads for CPU-bound analysis, threads for blocking Sheets I/O,
+# and how many requests per endpoint may compute at once
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", "4"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+ENDPOINT_CONCURRENCY_LIMIT = int(os.getenv("ENDPOINT_CONCURRENCY_LIMIT", "8"))
+
+# Storage backend: "sheets" (Google Sheets), "local" (SQLite file only) or "replica"
+# (reads served from the local SQLite copy, synced from Google Sheets every REPLICA_SYNC_SECONDS)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sheets").lower()
+LOCAL_STORAGE_FILE = os.getenv("LOCAL_STORAGE_FILE", os.path.join(CACHE_DIR, "sheets.sqlite"))
+REPLICA_SYNC_SECONDS = float(os.getenv("REPLICA_SYNC_SECONDS", "300"))
+
+# Every sheet the app reads or writes
+ALL_SHEETS = [
+    SHEET_RAW_DATA,
+    SHEET_CLEAN_DATA,
+    SHEET_QUANT_ANALYSIS,
+    SHEET_LEADERBOARD,
+    SHEET_USAGE_PATTERNS,
+    SHEET_KEYWORD_FREQ,
+    SHEET_SENTIMENT,
+]
+
+# Watermark of the last cleaning run (enables incremental cleaning of new Tally submissions)
+CLEANING_STATE_FILE = os.path.join(CACHE_DIR, "cleaning_state.json")
+
+# Persisted raw-header -> clean-column mappings, keyed by a hash of the header row
+SCHEMA_MAPPING_FILE = os.path.join(CACHE_DIR, "schema_mapping.json")
+
+# POST /recommendations/batch scores profiles in chunks of at most this many profile x review cells
+BATCH_RECOMMENDATION_CHUNK_CELLS = int(os.getenv("BATCH_RECOMMENDATION_CHUNK_CELLS", "1000000"))
+
+# In-memory form of a sheet's snapshot, as "module:function" (imported on first load so startup stays light)
+SHEET_PARSERS = {
+    SHEET_CLEAN_DATA: "analysis.typed_frame:to_typed_frame",
+}
+
+# Per-review text features (tokens, lemmas, sentiment) shared by the sentiment and keyword analyses.
+# New answers are processed on this many processes once there are at least TEXT_FEATURE_PARALLEL_MIN_TEXTS
+# of them (smaller batches run in-process)
+TEXT_FEATURE_STORE_FILE = os.path.join(CACHE_DIR, "text_features.sqlite")
+TEXT_FEATURE_WORKERS = int(os.getenv("TEXT_FEATURE_WORKERS", str(os.cpu_count() or 1)))
+TEXT_FEATURE_PARALLEL_MIN_TEXTS = int(os.getenv("TEXT_FEATURE_PARALLEL_MIN_TEXTS", "2000"))
+
+# Keyword analysis: answers are counted on this many processes once there are at least KEYWORD_PARALLEL_MIN_ROWS
+KEYWORD_WORKERS = int(os.getenv("KEYWORD_WORKERS", str(os.cpu_count() or 1)))
+KEYWORD_PARALLEL_MIN_ROWS = int(os.getenv("KEYWORD_PARALLEL_MIN_ROWS", "20000"))
+
+# main.py pipeline: stages whose dependencies are done run side by side on this many threads
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "6"))
+
+# How SheetsService.write_dataframe replaces a sheet: "diff" reads the current values and sends only the changed
+# ranges in one batch_update; "replace" clears the sheet and appends every row
+SHEETS_WRITE_MODE = os.getenv("SHEETS_WRITE_MODE", "diff").lower()
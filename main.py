@@ -1,53 +1,132 @@
 """
 Trainer App - Main Runner
-Runs all data processing and analysis tasks
+Runs all data processing and analysis tasks as a dependency graph
 """
 
+import argparse
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 from analysis.cleaning import clean_data
 from analysis.scoring import assign_score_tiers
 from analysis.leaderboard import create_leaderboard
 from analysis.usage_patterns import analyze_usage_patterns
+from analysis.sentiment import analyze_sentiment
+from analysis.keywords import analyze_keywords
+from analysis.recommendation_table import build_recommendation_table
+from services.storage import get_storage
+from config.settings import SHEET_CLEAN_DATA, PIPELINE_WORKERS
+
+
+def load_clean_data(context):
+    """Read Clean Live Data once; every analysis after this shares the frame (read-only)"""
+    snapshot = context["sheets"].get_snapshot(SHEET_CLEAN_DATA)
+    context["snapshot"] = snapshot
+    context["df"] = snapshot.df
+    print(f"Loaded {len(snapshot.df)} rows of {SHEET_CLEAN_DATA}")
+
+
+# Pipeline stages: name -> (stages it runs after, step taking the shared run context)
+STAGES = {
+    "clean": ((), lambda context: clean_data(context["sheets"], full_rebuild=context["full_clean"])),
+    "load": (("clean",), load_clean_data),
+    "scoring": (("load",), lambda context: assign_score_tiers(context["sheets"], df=context["df"])),
+    "leaderboard": (("load",), lambda context: create_leaderboard(context["sheets"], df=context["df"])),
+    "usage_patterns": (("load",), lambda context: analyze_usage_patterns(context["sheets"], df=context["df"])),
+    "sentiment": (("load",), lambda context: analyze_sentiment(context["sheets"], df=context["df"])),
+    "keywords": (("load",), lambda context: analyze_keywords(context["sheets"], df=context["df"])),
+    # Precompute recommendations for every dropdown combination
+    "recommendations": (("load",), lambda context: build_recommendation_table(context["snapshot"])),
+}
+
+# Stages that can be picked with --only/--skip ("load" runs whenever a picked stage needs the data)
+SELECTABLE_STAGES = [name for name in STAGES if name != "load"]
+
+
+def select_stages(only=None, skip=None):
+    """Stages to run, in graph order: --only narrows the run to the given stages, --skip leaves stages out"""
+    selected = set(only or SELECTABLE_STAGES) - set(skip or ())
+    if any("load" in STAGES[name][0] for name in selected):
+        selected.add("load")
+    return [name for name in STAGES if name in selected]
+
+
+def _run_stage(name, context):
+    """Run one stage: (status, wall seconds)"""
+    started = time.perf_counter()
+    try:
+        STAGES[name][1](context)
+        status = "ok"
+    except Exception as e:
+        print(f"\n[ERROR] Stage '{name}' failed: {e}")
+        traceback.print_exc()
+        status = "failed"
+    return status, time.perf_counter() - started
+
 
-def run_all_analyses():
-    """Run all analyses in sequence"""
+def run_pipeline(stages, context, workers=PIPELINE_WORKERS):
+    """Run stages as soon as the stages they run after are done, independent ones side by side.
+
+    Dependencies left out of `stages` count as done (e.g. --skip clean uses the current Clean Live Data);
+    stages after a failed one are skipped. Returns {stage: (status, wall seconds)}.
+    """
+    results = {}
+    waiting = {name: [dep for dep in STAGES[name][0] if dep in stages] for name in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline") as pool:
+        while waiting or running:
+            for name, deps in list(waiting.items()):
+                if any(results.get(dep, ("ok",))[0] != "ok" for dep in deps):
+                    results[name] = ("skipped", 0.0)
+                    del waiting[name]
+                elif all(dep in results for dep in deps):
+                    print(f"\n>>> {name}")
+                    running[pool.submit(_run_stage, name, context)] = name
+                    del waiting[name]
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+
+def run_all_analyses(full_clean=False, only=None, skip=None):
+    """Run the pipeline (full_clean rebuilds Clean Live Data from scratch); True if every stage succeeded"""
     print("=" * 50)
     print("TRAINER APP - FULL ANALYSIS")
     print("=" * 50)
     print()
-    
-    try:
-        # Step 1: Clean data
-        print("STEP 1: Data Cleaning")
-        print("-" * 50)
-        clean_data()
-        print()
-        
-        # Step 2: Score tier assignment
-        print("STEP 2: Score Tier Assignment")
-        print("-" * 50)
-        assign_score_tiers()
-        print()
-        
-        # Step 3: Create leaderboard
-        print("STEP 3: Leaderboard Creation")
-        print("-" * 50)
-        create_leaderboard()
-        print()
-        
-        # Step 4: Usage patterns
-        print("STEP 4: Usage Patterns Analysis")
-        print("-" * 50)
-        analyze_usage_patterns()
-        print()
-        
-        print("=" * 50)
-        print("[OK] ALL ANALYSES COMPLETE!")
-        print("=" * 50)
-        
-    except Exception as e:
-        print(f"\n[ERROR] Error occurred: {e}")
-        import traceback
-        traceback.print_exc()
+
+    # One service for every step so they all share the same spreadsheet handle
+    context = {"sheets": get_storage(), "full_clean": full_clean}
+    started = time.perf_counter()
+    results = run_pipeline(select_stages(only, skip), context)
+
+    print()
+    print("=" * 50)
+    print("Stage wall times:")
+    for name, (status, seconds) in results.items():
+        print(f"  {name:<16} {status:<8} {seconds:8.2f}s")
+    print(f"  {'total':<16} {'':<8} {time.perf_counter() - started:8.2f}s")
+    ok = all(status == "ok" for status, _ in results.values())
+    print("[OK] ALL ANALYSES COMPLETE!" if ok else "[ERROR] Some stages failed or were skipped")
+    print("=" * 50)
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the survey data and run the analyses")
+    parser.add_argument("--full-clean", action="store_true", help="rebuild Clean Live Data from scratch")
+    parser.add_argument("--only", nargs="+", choices=SELECTABLE_STAGES, metavar="STAGE",
+                        help=f"run only these stages ({', '.join(SELECTABLE_STAGES)})")
+    parser.add_argument("--skip", nargs="+", choices=SELECTABLE_STAGES, metavar="STAGE",
+                        help="leave these stages out")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    run_all_analyses()
\ No newline at end of file
+    args = parse_args()
+    sys.exit(0 if run_all_analyses(args.full_clean, only=args.only, skip=args.skip) else 1)
@@ -0,0 +1,29 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import COMPUTE_WORKERS, IO_WORKERS, ENDPOINT_CONCURRENCY_LIMIT
+
+# Separate pools so slow Sheets calls can never starve CPU-bound scoring (or the other way round)
+compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="compute")
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="sheets-io")
+
+_endpoint_limits = {}
+
+
+async def run_in(executor, fn, *args, **kwargs):
+    """Run a blocking function on an executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_compute(fn, *args, **kwargs):
+    """Run CPU-bound analysis on the bounded compute pool"""
+    return await run_in(compute_executor, fn, *args, **kwargs)
+
+
+def endpoint_limit(name):
+    """Semaphore capping how many requests to one endpoint are in flight at once"""
+    if name not in _endpoint_limits:
+        _endpoint_limits[name] = asyncio.Semaphore(ENDPOINT_CONCURRENCY_LIMIT)
+    return _endpoint_limits[name]
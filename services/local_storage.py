@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config.settings import LOCAL_STORAGE_FILE, REPLICA_SYNC_SECONDS, ALL_SHEETS
+from services.snapshot_cache import snapshot_cache
+from services.storage import StorageBackend
+
+
+def _cell_text(value):
+    """Store a cell the way Sheets hands it back: as display text"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class LocalStorage(StorageBackend):
+    """Offline backend: every sheet is kept as rows of text in a local SQLite file"""
+
+    def __init__(self, path=LOCAL_STORAGE_FILE):
+        self.path = path
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            # One row per sheet row; row 0 is the header. JSON rows keep duplicate headers (e.g. rawdata).
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_rows ("
+                "sheet TEXT NOT NULL, row_number INTEGER NOT NULL, cells TEXT NOT NULL, "
+                "PRIMARY KEY (sheet, row_number))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def read_values(self, sheet_name):
+        """Read all rows of a sheet from the local file"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT cells FROM sheet_rows WHERE sheet = ? ORDER BY row_number", (sheet_name,)
+            ).fetchall()
+        return [json.loads(cells) for (cells,) in rows]
+
+    def write_values(self, sheet_name, rows, clear_first=True):
+        """Replace (or append to) a sheet's rows"""
+        with self._write_lock, self._connect() as conn:
+            if clear_first:
+                conn.execute("DELETE FROM sheet_rows WHERE sheet = ?", (sheet_name,))
+                start = 0
+            else:
+                (last,) = conn.execute(
+                    "SELECT COALESCE(MAX(row_number), -1) FROM sheet_rows WHERE sheet = ?", (sheet_name,)
+                ).fetchone()
+                start = last + 1
+            conn.executemany(
+                "INSERT INTO sheet_rows (sheet, row_number, cells) VALUES (?, ?, ?)",
+                (
+                    (sheet_name, start + i, json.dumps([_cell_text(v) for v in row]))
+                    for i, row in enumerate(rows)
+                ),
+            )
+        snapshot_cache.invalidate(sheet_name)
+
+    def write_dataframe(self, sheet_name, df, clear_first=True, mode=None):
+        """Write a pandas DataFrame to a local sheet (the local file has no write modes, so mode is ignored)"""
+        self.write_values(sheet_name, self.rows_for_write(df), clear_first=clear_first)
+
+
+    def append_dataframe(self, sheet_name, df):
+        """Append a DataFrame's rows (no header row) to a local sheet"""
+        self.write_values(sheet_name, self.rows_for_write(df)[1:], clear_first=False)
+
+
+class ReplicaStorage(LocalStorage):
+    """Read replica: serves reads from the local copy, writes through to Google Sheets, re-syncs periodically"""
+
+    def __init__(self, path=LOCAL_STORAGE_FILE, sync_seconds=REPLICA_SYNC_SECONDS):
+        super().__init__(path)
+        from services.sheets_service import SheetsService
+        self.sheets = SheetsService()
+        self.sync_seconds = sync_seconds
+        self._sync_thread = None
+
+    def read_values(self, sheet_name):
+        """Read from the local copy, pulling the sheet from Google Sheets if it was never synced"""
+        self.start_sync()
+        rows = super().read_values(sheet_name)
+        if not rows:
+            rows = self.sync_sheet(sheet_name)
+        return rows
+
+    def write_dataframe(self, sheet_name, df, clear_first=True, mode=None):
+        """Write to Google Sheets (in the given write mode) and keep the local copy in step"""
+        self.sheets.write_dataframe(sheet_name, df, clear_first=clear_first, mode=mode)
+        super().write_dataframe(sheet_name, df, clear_first=clear_first)
+
+    def append_dataframe(self, sheet_name, df):
+        """Append to Google Sheets and keep the local copy in step"""
+        self.sheets.append_dataframe(sheet_name, df)
+        super().append_dataframe(sheet_name, df)
+
+    def sync_sheet(self, sheet_name):
+        """Copy one sheet from Google Sheets into the local file"""
+        rows = self.sheets.read_values(sheet_name)
+        # Unchanged sheets are left alone, so their cached snapshots (and everything derived from them) survive
+        if [[_cell_text(v) for v in row] for row in rows] != super().read_values(sheet_name):
+            self.write_values(sheet_name, rows)
+        return rows
+
+    def sync(self, sheet_names=ALL_SHEETS):
+        """Copy every sheet from Google Sheets into the local file"""
+        for sheet_name in sheet_names:
+            try:
+                self.sync_sheet(sheet_name)
+            except Exception as e:
+                print(f"Warning: replica sync of '{sheet_name}' failed: {e}")
+
+    def start_sync(self):
+        """Start the periodic background sync (once per process)"""
+        if self._sync_thread is not None:
+            return
+        with self._write_lock:
+            if self._sync_thread is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(self.sync_seconds)
+                    self.sync()
+
+            self._sync_thread = threading.Thread(target=loop, name="replica-sync", daemon=True)
+            self._sync_thread.start()
+
+
+def sync_from_sheets(path=LOCAL_STORAGE_FILE):
+    """One-off copy of every sheet from Google Sheets into the local file (e.g. to work offline)"""
+    print("Syncing Google Sheets into local storage...")
+    ReplicaStorage(path).sync()
+    print(f"[OK] Local storage synced: {path}")
+
+
+if __name__ == "__main__":
+    sync_from_sheets()
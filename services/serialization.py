@@ -0,0 +1,49 @@
+import orjson
+from fastapi.responses import Response
+
+# NumPy arrays/scalars are written natively; NaN and +/-inf become null
+_DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Values orjson doesn't know: pandas missing markers, NumPy scalars it can't take as-is, Timestamps"""
+    # Only reached for unusual values, so pandas/NumPy aren't needed to import this module
+    import numpy as np
+    import pandas as pd
+
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content):
+    """Serialize a response body to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=_DUMPS_OPTIONS)
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+def frame_records(df):
+    """DataFrame rows as dicts of plain Python values, converting each column once with tolist().
+
+    Missing/infinite numbers are left as floats; dumps writes them as null.
+    """
+    columns = list(df.columns)
+    values = [df.iloc[:, i].tolist() for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+class JSONBytesResponse(Response):
+    """JSON response that serializes with orjson, or sends already-serialized bytes as they are"""
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+
+from config.settings import SCOPES, CREDENTIALS_FILE, SPREADSHEET_NAME, SHEETS_HTTP_POOL_SIZE
+
+
+class SheetsClientManager:
+    """Process-wide owner of the authorized gspread client, spreadsheet and worksheet handles"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._creds = None
+        self._session = None
+        self._client = None
+        self._spreadsheet = None
+        self._worksheets = {}
+
+    def _load_credentials(self):
+        from google.oauth2.service_account import Credentials
+
+        # Check if running in production (Railway) or locally
+        if os.getenv('GOOGLE_CREDENTIALS'):
+            # Production: use environment variable
+            creds_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
+            return Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
+        # Local: use credentials.json file
+        return Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+
+    def _build_session(self, creds):
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+
+        # One keep-alive connection pool shared by every thread in the process
+        session = AuthorizedSession(creds)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SHEETS_HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        return session
+
+    def get_credentials(self):
+        """Get the service account credentials, refreshing the access token if it has expired"""
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load_credentials()
+            if not self._creds.valid:
+                from google.auth.transport.requests import Request
+                self._creds.refresh(Request())
+            return self._creds
+
+    def get_client(self):
+        """Get the shared authorized gspread client"""
+        with self._lock:
+            creds = self.get_credentials()
+            if self._client is None:
+                import gspread
+                self._session = self._build_session(creds)
+                self._client = gspread.authorize(None, session=self._session)
+            return self._client
+
+    def get_spreadsheet(self):
+        """Get the shared spreadsheet handle, opening it on first use"""
+        with self._lock:
+            if self._spreadsheet is None:
+                self._spreadsheet = self.get_client().open(SPREADSHEET_NAME)
+            return self._spreadsheet
+
+    def get_worksheet(self, sheet_name):
+        """Get a cached worksheet handle (raises gspread.WorksheetNotFound if it doesn't exist)"""
+        with self._lock:
+            worksheet = self._worksheets.get(sheet_name)
+            if worksheet is None:
+                worksheet = self.get_spreadsheet().worksheet(sheet_name)
+                self._worksheets[sheet_name] = worksheet
+            return worksheet
+
+    def add_worksheet(self, sheet_name, rows="1000", cols="20"):
+        """Create a worksheet and cache its handle"""
+        with self._lock:
+            worksheet = self.get_spreadsheet().add_worksheet(title=sheet_name, rows=rows, cols=cols)
+            self._worksheets[sheet_name] = worksheet
+            return worksheet
+
+    def forget_worksheet(self, sheet_name):
+        """Drop a cached worksheet handle so the next get_worksheet reopens it (with its current grid size)"""
+        with self._lock:
+            self._worksheets.pop(sheet_name, None)
+
+
+sheets_client_manager = SheetsClientManager()
@@ -1,79 +1,157 @@
 import gspread
-from google.oauth2.service_account import Credentials
-from config.settings import SCOPES, CREDENTIALS_FILE, SPREADSHEET_NAME
+from gspread.utils import ValueRenderOption, rowcol_to_a1
+from services.sheets_client import sheets_client_manager
+from services.snapshot_cache import snapshot_cache
+from services.storage import StorageBackend
+from config.settings import SHEETS_WRITE_MODE
 
-class SheetsService:
-    def __init__(self):
-        """Initialize Google Sheets connection"""
-        import os
-        import json
-        
-        # Check if running in production (Railway) or locally
-        if os.getenv('GOOGLE_CREDENTIALS'):
-            # Production: use environment variable
-            creds_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
-            self.creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-        else:
-            # Local: use credentials.json file
-            self.creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        
-        self.client = gspread.authorize(self.creds)
-        self.spreadsheet = self.client.open(SPREADSHEET_NAME)
+
+def _same_cell(old, new):
+    # 5 and 5.0 are the same cell; TRUE and 1 are not
+    return old == new and isinstance(old, bool) == isinstance(new, bool)
+
+
+def changed_blocks(current, rows):
+    """Cell blocks to write so a sheet holding `current` ends up holding `rows`: [(row, column, values)], 1-based.
+
+    Each run of consecutive changed rows becomes one block spanning the columns that changed in any of them;
+    cells and rows that are no longer in `rows` are blanked.
+    """
+    width = max([len(row) for row in current] + [len(row) for row in rows] + [0])
+    blank = [""] * width
+
+    def padded(table, i):
+        row = table[i] if i < len(table) else []
+        return list(row) + blank[len(row):]
+
+    blocks = []
+    run = None  # [first row index, first column, last column, rows]
+    for i in range(max(len(current), len(rows))):
+        old, new = padded(current, i), padded(rows, i)
+        changed = [j for j, (a, b) in enumerate(zip(old, new)) if not _same_cell(a, b)]
+        if not changed:
+            if run is not None:
+                blocks.append(run)
+                run = None
+            continue
+        if run is None:
+            run = [i, changed[0], changed[-1], []]
+        run[1], run[2] = min(run[1], changed[0]), max(run[2], changed[-1])
+        run[3].append(new)
+    if run is not None:
+        blocks.append(run)
+    return [(first + 1, start + 1, [row[start:end + 1] for row in block_rows])
+            for first, start, end, block_rows in blocks]
+
+
+class SheetsService(StorageBackend):
+    def __init__(self, manager=None):
+        """Initialize Google Sheets connection (cheap: the authorized client is shared per process)"""
+        self.manager = manager or sheets_client_manager
+    
+    @property
+    def creds(self):
+        return self.manager.get_credentials()
+    
+    @property
+    def client(self):
+        return self.manager.get_client()
+    
+    @property
+    def spreadsheet(self):
+        return self.manager.get_spreadsheet()
     
     def get_sheet(self, sheet_name):
         """Get a specific worksheet by name"""
         try:
-            return self.spreadsheet.worksheet(sheet_name)
+            return self.manager.get_worksheet(sheet_name)
         except gspread.WorksheetNotFound:
             print(f"Warning: Sheet '{sheet_name}' not found. Creating it...")
-            return self.spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
+            return self.manager.add_worksheet(sheet_name, rows="1000", cols="20")
     
-    def read_to_dataframe(self, sheet_name):
-        """Read sheet data into a pandas DataFrame"""
-        import pandas as pd
-        sheet = self.get_sheet(sheet_name)
-        
-        # Get all values
-        all_values = sheet.get_all_values()
-        
-        if not all_values:
-            return pd.DataFrame()
-        
-        # First row is headers, rest is data
-        headers = all_values[0]
-        data = all_values[1:]
-        
-        return pd.DataFrame(data, columns=headers)
+    def get_fresh_sheet(self, sheet_name):
+        """Get a worksheet with its current grid size: cached handles keep the row/column counts they were
+        opened with, which go stale once another process adds rows"""
+        self.manager.forget_worksheet(sheet_name)
+        return self.get_sheet(sheet_name)
     
-    def write_dataframe(self, sheet_name, df, clear_first=True):
-        """Write a pandas DataFrame to a sheet"""
+    def read_values(self, sheet_name):
+        """Download all values of a sheet from Google Sheets"""
+        return self.get_sheet(sheet_name).get_all_values()
+    
+    def read_rows(self, sheet_name, from_row):
+        """Download the header row and the data rows from the from_row-th onward in one request"""
+        sheet = self.get_fresh_sheet(sheet_name)
+        # Data row n lives on sheet row n + 1 (row 1 is the header)
+        first_row = max(from_row, 1) + 1
+        if first_row > sheet.row_count:
+            header_range, data_range = sheet.batch_get(["1:1"])[0], []
+        else:
+            header_range, data_range = sheet.batch_get(["1:1", f"{first_row}:{sheet.row_count}"])
+        headers = header_range[0] if header_range else []
+        # The API trims trailing empty cells; pad rows back to the header width like get_all_values does
+        rows = [row + [""] * (len(headers) - len(row)) for row in data_range]
+        return headers, rows
+    
+    def read_column(self, sheet_name, header):
+        """Download the header row, then only the column named `header`"""
         sheet = self.get_sheet(sheet_name)
-        
-        # Clear existing content
-        if clear_first:
-            sheet.clear()
-        
+        headers = sheet.row_values(1)
+        if header not in headers:
+            return None
+        # The API stops at the column's last non-empty cell
+        return sheet.col_values(headers.index(header) + 1)[1:]
+    
+    def write_dataframe(self, sheet_name, df, clear_first=True, mode=None):
+        """Write a pandas DataFrame to a sheet.
+
+        When replacing a sheet, mode "diff" (the SHEETS_WRITE_MODE default) sends only the cells that differ from
+        the sheet's current values; "replace" clears the sheet and appends every row.
+        """
         # Write headers and data
-        import pandas as pd
-        import numpy as np
-        
-        # Replace NaN, None, and inf values with empty strings for JSON compatibility
-        df_clean = df.fillna('').replace([np.inf, -np.inf], '')
+        all_rows = self.rows_for_write(df)
         
-        headers = df_clean.columns.tolist()
-        values = df_clean.values.tolist()
+        if clear_first and (mode or SHEETS_WRITE_MODE) == "diff":
+            # The diff sizes the grid from row_count/col_count, so they must be current
+            self._write_changes(self.get_fresh_sheet(sheet_name), all_rows)
+        else:
+            sheet = self.get_sheet(sheet_name)
+            
+            # Clear existing content
+            if clear_first:
+                sheet.clear()
+            
+            # Use batch operation instead of row-by-row to reduce API calls
+            if all_rows:
+                sheet.append_rows(all_rows)
         
-        # Convert any remaining non-serializable values to strings
-        def clean_value(val):
-            if pd.isna(val) or val is None:
-                return ''
-            if isinstance(val, (float, np.floating)) and (np.isnan(val) or np.isinf(val)):
-                return ''
-            return val
+        # The sheet changed, so the next read must not be served from a stale snapshot
+        snapshot_cache.invalidate(sheet_name)
+    
+    def _write_changes(self, sheet, rows):
+        """Make a sheet hold exactly `rows` with one read and (if anything changed) one batch_update"""
+        # Unformatted, so numbers compare as numbers rather than as their display text
+        current = sheet.get_values(value_render_option=ValueRenderOption.unformatted)
+        blocks = changed_blocks(current, rows)
+        if not blocks:
+            return
         
-        cleaned_values = [[clean_value(val) for val in row] for row in values]
+        # Value updates can't write past the grid, so grow it first
+        height, width = len(rows), max((len(row) for row in rows), default=0)
+        if height > sheet.row_count or width > sheet.col_count:
+            sheet.resize(rows=max(height, sheet.row_count), cols=max(width, sheet.col_count))
         
-        # Use batch operation instead of row-by-row to reduce API calls
-        all_rows = [headers] + cleaned_values
-        if all_rows:
-            sheet.append_rows(all_rows)
\ No newline at end of file
+        sheet.batch_update([
+            {
+                "range": f"{rowcol_to_a1(row, col)}:{rowcol_to_a1(row + len(values) - 1, col + len(values[0]) - 1)}",
+                "values": values,
+            }
+            for row, col, values in blocks
+        ])
+    
+    def append_dataframe(self, sheet_name, df):
+        """Append a DataFrame's rows (no header row) below a sheet's existing data"""
+        rows = self.rows_for_write(df)[1:]
+        if rows:
+            self.get_sheet(sheet_name).append_rows(rows)
+        snapshot_cache.invalidate(sheet_name)
\ No newline at end of file
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one in-flight call whose result everyone shares"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    def _join(self, key):
+        # Returns (future, is_leader); the leader is the one caller that actually runs the function
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.collapsed += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self.calls += 1
+            return future, True
+
+    def _run(self, key, fn, future):
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def do(self, key, fn):
+        """Run fn() unless a call for key is already in flight, in which case wait for its result"""
+        future, is_leader = self._join(key)
+        if is_leader:
+            self._run(key, fn, future)
+        return future.result()
+
+    async def ado(self, key, fn, executor=None):
+        """Async do(): the leader runs fn on an executor, followers await it without holding a thread"""
+        future, is_leader = self._join(key)
+        if is_leader:
+            asyncio.get_running_loop().run_in_executor(executor, self._run, key, fn, future)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._in_flight),
+            }
@@ -0,0 +1,131 @@
+import hashlib
+import importlib
+import threading
+import time
+
+from config.settings import SHEET_PARSERS, SNAPSHOT_TTL_SECONDS
+from services.single_flight import SingleFlight
+
+
+def compute_version(df):
+    """Hash a DataFrame's headers and cells so identical downloads keep the same version"""
+    import pandas as pd
+
+    digest = hashlib.sha1("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class Snapshot:
+    """A parsed sheet held in memory, tagged with its data version"""
+
+    def __init__(self, sheet_name, df, version):
+        self.sheet_name = sheet_name
+        self.df = df
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self._derived = {}
+        self._derive_lock = threading.Lock()
+
+    def age(self):
+        """Seconds since the snapshot was last confirmed against the source"""
+        return time.monotonic() - self.loaded_at
+
+    def derive(self, name, build):
+        """Build an artifact (index, typed view, ...) from this snapshot once and reuse it until the data changes"""
+        with self._derive_lock:
+            if name not in self._derived:
+                self._derived[name] = build(self.df)
+            return self._derived[name]
+
+
+class SnapshotCache:
+    """Process-wide cache holding one snapshot per sheet (stale-while-revalidate)"""
+
+    def __init__(self, ttl=SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl
+        self._snapshots = {}
+        self._refreshing = set()
+        self._parsers = dict(SHEET_PARSERS)
+        self._lock = threading.Lock()
+        # At most one fetch per sheet in flight; concurrent cold readers share its result
+        self.fetches = SingleFlight()
+
+    def _parser(self, sheet_name):
+        # SHEET_PARSERS turns a sheet's downloaded frame into its in-memory form (e.g. typed columns) before it is
+        # cached; "module:function" paths are imported the first time the sheet is loaded
+        parse = self._parsers.get(sheet_name)
+        if isinstance(parse, str):
+            module, _, name = parse.partition(":")
+            parse = getattr(importlib.import_module(module), name)
+            self._parsers[sheet_name] = parse
+        return parse
+
+    def get(self, sheet_name, fetch):
+        """Return the snapshot for a sheet, fetching on first use and refreshing in the background once stale"""
+        with self._lock:
+            snapshot = self._snapshots.get(sheet_name)
+        if snapshot is None:
+            return self.refresh(sheet_name, fetch)
+        if snapshot.age() >= self.ttl:
+            self._refresh_in_background(sheet_name, fetch)
+        return snapshot
+
+    async def aget(self, sheet_name, fetch, executor=None):
+        """Async get: warm (even stale) snapshots return immediately, cold loads run on an executor"""
+        with self._lock:
+            snapshot = self._snapshots.get(sheet_name)
+        if snapshot is not None:
+            if snapshot.age() >= self.ttl:
+                self._refresh_in_background(sheet_name, fetch)
+            return snapshot
+        return await self.fetches.ado(sheet_name, lambda: self.put(sheet_name, fetch()), executor)
+
+    def refresh(self, sheet_name, fetch):
+        """Fetch a sheet synchronously and store it (joining a fetch already in flight for the sheet)"""
+        return self.fetches.do(sheet_name, lambda: self.put(sheet_name, fetch()))
+
+    def put(self, sheet_name, df):
+        """Store a freshly loaded DataFrame, keeping the existing snapshot if the data is unchanged"""
+        # Versioned on the downloaded values, so unchanged data is detected before any parsing
+        version = compute_version(df)
+        with self._lock:
+            current = self._snapshots.get(sheet_name)
+            if current is not None and current.version == version:
+                current.loaded_at = time.monotonic()
+                return current
+        parse = self._parser(sheet_name)
+        if parse is not None:
+            df = parse(df)
+        with self._lock:
+            snapshot = Snapshot(sheet_name, df, version)
+            self._snapshots[sheet_name] = snapshot
+        return snapshot
+
+    def invalidate(self, sheet_name=None):
+        """Drop one sheet's snapshot (or all of them) so the next read goes to the source"""
+        with self._lock:
+            if sheet_name is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(sheet_name, None)
+
+    def _refresh_in_background(self, sheet_name, fetch):
+        with self._lock:
+            if sheet_name in self._refreshing:
+                return
+            self._refreshing.add(sheet_name)
+
+        def worker():
+            try:
+                self.refresh(sheet_name, fetch)
+            except Exception as e:
+                print(f"Warning: background refresh of '{sheet_name}' failed, serving stale data: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(sheet_name)
+
+        threading.Thread(target=worker, name=f"snapshot-refresh-{sheet_name}", daemon=True).start()
+
+
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,110 @@
+import threading
+from abc import ABC, abstractmethod
+
+from config.settings import STORAGE_BACKEND
+from services.snapshot_cache import snapshot_cache
+from services.async_support import io_executor
+
+
+class StorageBackend(ABC):
+    """Where sheets live: read a sheet into a DataFrame, write a DataFrame to a sheet"""
+
+    @abstractmethod
+    def read_values(self, sheet_name):
+        """Raw sheet contents as rows of strings, header row first (duplicate headers are kept)"""
+
+    def read_rows(self, sheet_name, from_row):
+        """Header row plus the data rows from the from_row-th (1-based) onward"""
+        all_values = self.read_values(sheet_name)
+        if not all_values:
+            return [], []
+        return all_values[0], all_values[max(from_row, 1):]
+
+    def read_column(self, sheet_name, header):
+        """Every data value under the first column named `header` (None if the sheet has no such column)"""
+        all_values = self.read_values(sheet_name)
+        if not all_values or header not in all_values[0]:
+            return None
+        position = all_values[0].index(header)
+        return [row[position] if position < len(row) else "" for row in all_values[1:]]
+
+    @abstractmethod
+    def write_dataframe(self, sheet_name, df, clear_first=True, mode=None):
+        """Write a pandas DataFrame to a sheet (mode: how a backend that supports several replaces a sheet,
+        e.g. SHEETS_WRITE_MODE's "diff"/"replace"; others ignore it)"""
+
+    @abstractmethod
+    def append_dataframe(self, sheet_name, df):
+        """Append a DataFrame's rows (no header row) below a sheet's existing data"""
+
+    def rows_for_write(self, df):
+        """Header row plus data rows with NaN/None/inf replaced by empty strings (JSON-safe)"""
+        import pandas as pd
+        import numpy as np
+        
+        # One vectorized pass per column; object arrays hold plain Python values (categoricals as their values)
+        columns = []
+        for _, series in df.items():
+            values = series.to_numpy(dtype=object)
+            values[pd.isna(values)] = ''
+            # Compared only once missing markers (pd.NA can't be compared) are gone
+            values[(values == np.inf) | (values == -np.inf)] = ''
+            columns.append(values)
+        
+        headers = df.columns.tolist()
+        rows = np.column_stack(columns).tolist() if columns and len(df) else []
+        return [headers] + rows
+
+    def download_dataframe(self, sheet_name):
+        """Load sheet data from the backend into a pandas DataFrame (bypassing the snapshot cache)"""
+        import pandas as pd
+        
+        # Get all values
+        all_values = self.read_values(sheet_name)
+        
+        if not all_values:
+            return pd.DataFrame()
+        
+        # First row is headers, rest is data
+        headers = all_values[0]
+        data = all_values[1:]
+        
+        return pd.DataFrame(data, columns=headers)
+
+    def read_to_dataframe(self, sheet_name, use_cache=True):
+        """Read sheet data into a pandas DataFrame (served from the snapshot cache by default)"""
+        if not use_cache:
+            return self.download_dataframe(sheet_name)
+        # Hand out a copy so callers can add/convert columns without touching the shared snapshot
+        return self.get_snapshot(sheet_name).df.copy()
+
+    def get_snapshot(self, sheet_name):
+        """Get the cached snapshot (DataFrame + data version) for a sheet"""
+        return snapshot_cache.get(sheet_name, lambda: self.download_dataframe(sheet_name))
+
+    async def aget_snapshot(self, sheet_name):
+        """Async version of get_snapshot: never blocks the event loop on a download"""
+        return await snapshot_cache.aget(sheet_name, lambda: self.download_dataframe(sheet_name), io_executor)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The process-wide storage backend selected by STORAGE_BACKEND"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == "sheets":
+                from services.sheets_service import SheetsService
+                _storage = SheetsService()
+            elif STORAGE_BACKEND == "local":
+                from services.local_storage import LocalStorage
+                _storage = LocalStorage()
+            elif STORAGE_BACKEND == "replica":
+                from services.local_storage import ReplicaStorage
+                _storage = ReplicaStorage()
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}' (expected sheets, local or replica)")
+        return _storage
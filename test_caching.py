@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+
+from services.snapshot_cache import SnapshotCache
+from test_snapshot_cache import SHEET, BlockingFetch, wait_for
+
+
+def test_concurrent_cold_readers_share_one_fetch():
+    cache, fetch = SnapshotCache(ttl=60), BlockingFetch()
+    fetch.hold()
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(cache.get(SHEET, fetch))) for _ in range(8)]
+    for reader in readers:
+        reader.start()
+
+    # Every reader but the leader joins the fetch already in flight
+    wait_for(lambda: cache.fetches.stats()["collapsed"] == 7)
+    fetch.release()
+    for reader in readers:
+        reader.join()
+
+    assert fetch.calls == 1
+    assert len({id(snapshot) for snapshot in results}) == 1
+    assert cache.fetches.stats() == {"calls": 1, "collapsed": 7, "in_flight": 0}
+
+
+def test_concurrent_async_cold_readers_share_one_fetch():
+    cache, fetch = SnapshotCache(ttl=60), BlockingFetch()
+    fetch.hold()
+
+    async def read_all():
+        readers = [asyncio.ensure_future(cache.aget(SHEET, fetch)) for _ in range(8)]
+        deadline = time.monotonic() + 5
+        while cache.fetches.stats()["collapsed"] < 7:
+            assert time.monotonic() < deadline, "timed out"
+            await asyncio.sleep(0.001)
+        fetch.release()
+        return await asyncio.gather(*readers)
+
+    results = asyncio.run(read_all())
+
+    assert fetch.calls == 1
+    assert len({id(snapshot) for snapshot in results}) == 1
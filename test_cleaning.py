@@ -0,0 +1,99 @@
+import pytest
+
+from analysis import cleaning, schema_mapping
+from analysis.cleaning import clean_data
+from config.settings import SHEET_CLEAN_DATA, SHEET_RAW_DATA
+from services.local_storage import LocalStorage
+
+RAW_HEADERS = ["Submission ID", "Submitted at", "Trainer Model", "Score"]
+
+
+def raw_rows(start, stop):
+    return [[f"id{i}", f"2024-01-{i + 1:02d}", f"Trainer {i % 3}", str(i % 10)] for i in range(start, stop)]
+
+
+@pytest.fixture
+def sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(cleaning, "CLEANING_STATE_FILE", str(tmp_path / "cleaning_state.json"))
+    monkeypatch.setattr(schema_mapping, "SCHEMA_MAPPING_FILE", str(tmp_path / "schema_mapping.json"))
+    monkeypatch.setattr(schema_mapping, "_memo", {})
+    storage = LocalStorage(str(tmp_path / "sheets.sqlite"))
+    storage.write_values(SHEET_RAW_DATA, [RAW_HEADERS] + raw_rows(0, 5))
+    clean_data(storage, full_rebuild=True)
+    return storage
+
+
+def count_writes(storage, monkeypatch):
+    """Names of the write calls made on `storage` from now on"""
+    calls = []
+
+    def recording(name):
+        original = getattr(storage, name)
+
+        def write(*args, **kwargs):
+            calls.append(name)
+            return original(*args, **kwargs)
+        return write
+
+    for name in ("write_dataframe", "append_dataframe"):
+        monkeypatch.setattr(storage, name, recording(name))
+    return calls
+
+
+def clean_ids(storage):
+    values = storage.read_values(SHEET_CLEAN_DATA)
+    assert values[0][0] == "Submission ID"
+    return [row[0] for row in values[1:]]
+
+
+def test_new_submissions_are_appended(sheets, monkeypatch):
+    sheets.write_values(SHEET_RAW_DATA, raw_rows(5, 8), clear_first=False)
+    writes = count_writes(sheets, monkeypatch)
+
+    clean_data(sheets)
+
+    assert writes == ["append_dataframe"]
+    assert clean_ids(sheets) == [f"id{i}" for i in range(8)]
+
+
+def test_no_new_submissions_writes_nothing(sheets, monkeypatch):
+    writes = count_writes(sheets, monkeypatch)
+
+    clean_data(sheets)
+
+    assert writes == []
+
+
+def test_edited_raw_rows_rebuild(sheets, monkeypatch):
+    rows = raw_rows(0, 6)
+    rows[4][0] = "edited"
+    sheets.write_values(SHEET_RAW_DATA, [RAW_HEADERS] + rows)
+    writes = count_writes(sheets, monkeypatch)
+
+    clean_data(sheets)
+
+    assert writes == ["write_dataframe"]
+    assert clean_ids(sheets) == [row[0] for row in rows]
+
+
+def test_cleared_clean_sheet_rebuilds(sheets, monkeypatch):
+    sheets.write_values(SHEET_CLEAN_DATA, [])
+    sheets.write_values(SHEET_RAW_DATA, raw_rows(5, 6), clear_first=False)
+    writes = count_writes(sheets, monkeypatch)
+
+    clean_data(sheets)
+
+    assert writes == ["write_dataframe"]
+    assert clean_ids(sheets) == [f"id{i}" for i in range(6)]
+
+
+def test_clean_sheet_ahead_of_watermark_rebuilds(sheets, monkeypatch):
+    # Another machine already appended id5 to Clean Live Data; appending it again would duplicate it
+    sheets.write_values(SHEET_RAW_DATA, raw_rows(5, 6), clear_first=False)
+    sheets.write_values(SHEET_CLEAN_DATA, [["id5", "", "", ""]], clear_first=False)
+    writes = count_writes(sheets, monkeypatch)
+
+    clean_data(sheets)
+
+    assert writes == ["write_dataframe"]
+    assert clean_ids(sheets) == [f"id{i}" for i in range(6)]
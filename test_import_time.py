@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+# Cumulative `import api` time allowed (it measures ~0.3 s: FastAPI and pydantic, no pandas)
+API_IMPORT_BUDGET_SECONDS = 1.5
+
+# Loaded on first use only, never while the web process starts
+LAZY_MODULES = ["pandas", "numpy", "nltk", "textblob", "gspread"]
+
+ANALYSIS_MODULES = [
+    "analysis.leaderboard",
+    "analysis.usage_patterns",
+    "analysis.recommendations",
+    "analysis.recommendation_table",
+    "analysis.batch_recommendations",
+    "analysis.scoring",
+    "analysis.keywords",
+    "analysis.sentiment",
+]
+
+
+def run_python(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(module):
+    """{module: cumulative import time in seconds} from `python -X importtime -c "import <module>"`"""
+    stderr = run_python(f"import {module}", "-X", "importtime").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_api_import_is_fast_and_lazy():
+    times = import_times("api")
+    assert times["api"] < API_IMPORT_BUDGET_SECONDS, f"import api took {times['api']:.2f}s"
+    loaded = [module for module in LAZY_MODULES if module in times]
+    assert not loaded, f"import api loaded {loaded}"
+
+
+def test_module_import_has_no_side_effects():
+    code = "\n".join([f"import {module}" for module in ANALYSIS_MODULES] + [
+        "import sys",
+        "print(sorted(m for m in ('nltk', 'textblob', 'gspread') if m in sys.modules), end='')",
+    ])
+    assert run_python(code).stdout == "[]"
@@ -0,0 +1,49 @@
+from collections import Counter
+
+import pytest
+
+from analysis import keywords
+from analysis.keywords import count_keywords, merge_keyword_counts
+
+ROWS = [
+    ("Trainer A", "Pain Experienced", ("sore", "knee", "and", "the", "heel")),
+    ("Trainer A", "Post Run Feel", ("legs", "felt", "fresh", "42k", "ok")),
+    ("Trainer B", "Pain Experienced", ("sore", "knee", "and", "the", "heel")),
+    (None, "Pain Experienced", ("knee", "knee")),
+    ("Trainer B", "Post Run Feel", ("fresh", "and", "bouncy")),
+]
+
+
+@pytest.fixture(autouse=True)
+def stop_words(monkeypatch):
+    # The NLTK corpus may not be downloadable here; the counter only needs a set
+    monkeypatch.setattr(keywords, "_stop_words", lambda: frozenset({"and", "the"}))
+
+
+def test_counts_overall_per_trainer_and_per_column():
+    counts = count_keywords(iter(ROWS), len(ROWS), workers=1)
+
+    assert counts["total"] == Counter(knee=4, sore=2, heel=2, fresh=2, legs=1, felt=1, bouncy=1)
+    assert counts["by_trainer"] == {
+        "Trainer A": Counter(sore=1, knee=1, heel=1, legs=1, felt=1, fresh=1),
+        "Trainer B": Counter(sore=1, knee=1, heel=1, fresh=1, bouncy=1),
+    }
+    assert counts["by_column"] == {
+        "Pain Experienced": Counter(knee=4, sore=2, heel=2),
+        "Post Run Feel": Counter(legs=1, felt=1, fresh=2, bouncy=1),
+    }
+
+
+def test_ties_keep_first_seen_order():
+    counts = count_keywords(iter(ROWS), len(ROWS), workers=1)
+    assert [word for word, _ in counts["total"].most_common()] == [
+        "knee", "sore", "heel", "fresh", "legs", "felt", "bouncy",
+    ]
+
+
+def test_merged_shards_equal_one_pass():
+    whole = count_keywords(iter(ROWS), len(ROWS), workers=1)
+    merged = merge_keyword_counts([keywords._count_rows(ROWS[:2]), keywords._count_rows(ROWS[2:])])
+
+    assert merged == whole
+    assert merged["total"].most_common() == whole["total"].most_common()
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from services.local_storage import ReplicaStorage
+from services.snapshot_cache import snapshot_cache
+
+
+class FakeSheets:
+    def __init__(self, rows):
+        self.rows = rows
+
+        self.writes = []
+
+    def read_values(self, sheet_name):
+        return [list(row) for row in self.rows]
+
+    def write_dataframe(self, sheet_name, df, clear_first=True, mode=None):
+        self.writes.append((sheet_name, clear_first, mode))
+
+
+def test_replica_sync_keeps_snapshot_of_unchanged_sheet(tmp_path):
+    replica = ReplicaStorage(str(tmp_path / "sheets.sqlite"), sync_seconds=3600)
+    replica.sheets = FakeSheets([["Trainer Model", "Score"], ["Hoka Clifton 9", "8"]])
+    sheet = "Replica Test"
+    try:
+        snapshot = replica.get_snapshot(sheet)
+
+        replica.sync_sheet(sheet)
+        assert replica.get_snapshot(sheet) is snapshot
+
+        replica.sheets.rows.append(["Brooks Ghost 15", "7"])
+        replica.sync_sheet(sheet)
+        refreshed = replica.get_snapshot(sheet)
+        assert refreshed is not snapshot
+        assert len(refreshed.df) == 2
+    finally:
+        snapshot_cache.invalidate(sheet)
+
+
+def test_replica_write_passes_write_mode_through(tmp_path):
+    replica = ReplicaStorage(str(tmp_path / "sheets.sqlite"), sync_seconds=3600)
+    replica.sheets = FakeSheets([])
+    df = pd.DataFrame({"Trainer Model": ["Hoka Clifton 9"], "Score": [8]})
+
+    replica.write_dataframe("Replica Test", df, mode="replace")
+
+    assert replica.sheets.writes == [("Replica Test", True, "replace")]
+    assert super(ReplicaStorage, replica).read_values("Replica Test") == [["Trainer Model", "Score"], ["Hoka Clifton 9", "8"]]
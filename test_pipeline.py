@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+import main
+from main import SELECTABLE_STAGES, run_pipeline, select_stages
+
+
+def test_select_all_stages_in_graph_order():
+    assert select_stages() == list(main.STAGES)
+
+
+def test_only_adds_load_when_a_stage_needs_the_data():
+    assert select_stages(only=["keywords", "scoring"]) == ["load", "scoring", "keywords"]
+    assert select_stages(only=["clean"]) == ["clean"]
+
+
+def test_skip_leaves_stages_out():
+    assert select_stages(skip=["clean", "sentiment"]) == [
+        name for name in main.STAGES if name not in ("clean", "sentiment")
+    ]
+    assert "load" not in SELECTABLE_STAGES
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Fake graph: a -> b -> c, a -> d, plus e on its own; stages record themselves in context["ran"]"""
+    def step(name, fail=False):
+        def run(context):
+            context["ran"].append(name)
+            if fail:
+                raise RuntimeError(f"{name} broke")
+        return run
+
+    graph = {
+        "a": ((), step("a")),
+        "b": (("a",), step("b", fail=True)),
+        "c": (("b",), step("c")),
+        "d": (("a",), step("d")),
+        "e": ((), step("e")),
+    }
+    monkeypatch.setattr(main, "STAGES", graph)
+    return graph
+
+
+def test_stages_after_a_failure_are_skipped(stages):
+    context = {"ran": []}
+    results = run_pipeline(list(stages), context, workers=2)
+
+    assert {name: status for name, (status, _) in results.items()} == {
+        "a": "ok", "b": "failed", "c": "skipped", "d": "ok", "e": "ok",
+    }
+    assert sorted(context["ran"]) == ["a", "b", "d", "e"]
+    assert context["ran"].index("a") < context["ran"].index("d")
+
+
+def test_dependencies_left_out_count_as_done(stages):
+    context = {"ran": []}
+    results = run_pipeline(["d"], context, workers=2)
+
+    assert results["d"][0] == "ok"
+    assert context["ran"] == ["d"]
+
+
+def test_independent_stages_run_side_by_side(monkeypatch):
+    # Each stage waits for the other; run one after the other, the barrier would time out
+    barrier = threading.Barrier(2, timeout=5)
+    graph = {name: ((), lambda context: barrier.wait()) for name in ("x", "y")}
+    monkeypatch.setattr(main, "STAGES", graph)
+
+    results = run_pipeline(["x", "y"], {}, workers=2)
+
+    assert {name: status for name, (status, _) in results.items()} == {"x": "ok", "y": "ok"}
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from analysis.recommendation_index import TermMatcher, ValueIndex
+from analysis.recommendations import PAIN_MATCHER, PAIN_VOCABULARY
+
+PAIN_ANSWERS = [
+    "No pain", "Knee pain", "Blisters on my heel", "Hips and knee", "none", "Shin splints",
+    "Achilles, calf", "Plantar fasciitis - arch", "Lower back", "Big toe blister", "", None,
+]
+
+
+def test_matcher_finds_overlapping_and_prefix_terms():
+    matcher = TermMatcher(["blister", "blisters", "hip", "hips", "ship"])
+    assert matcher.find("blisters on both hips") == {"blister", "blisters", "hip", "hips"}
+    assert matcher.find("shipped") == {"ship", "hip"}
+    assert matcher.find("nothing") == set()
+
+
+def test_tagged_terms_match_str_contains():
+    series = pd.Series(PAIN_ANSWERS * 3, dtype=object)
+    normalized = series.astype(str).str.lower().str.strip()
+    index = ValueIndex(series)
+    index.tag(PAIN_MATCHER)
+
+    for term in PAIN_VOCABULARY:
+        mask = np.unpackbits(index.contains(term), count=len(series)).astype(bool)
+        assert mask.tolist() == normalized.str.contains(term).tolist(), term
+
+
+def test_untagged_query_falls_back_to_scanning():
+    series = pd.Series(PAIN_ANSWERS, dtype=object)
+    index = ValueIndex(series)
+    index.tag(PAIN_MATCHER)
+
+    assert "splint" not in index.term_bitmaps
+    mask = np.unpackbits(index.contains("splint"), count=len(series)).astype(bool)
+    assert mask.tolist() == [answer == "Shin splints" for answer in PAIN_ANSWERS]
@@ -0,0 +1,203 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.batch_recommendations import iter_batch_recommendations
+from analysis.recommendations import get_recommendations, normalize_request, recommendations_payload
+from analysis.schema import COMFORT_COL_ALT, CUSHIONING_COL_ALT, RESPONSIVENESS_COL_ALT
+from config.settings import SHEET_CLEAN_DATA
+from services.serialization import dumps, loads
+from services.snapshot_cache import snapshot_cache
+
+
+def make_reviews(n_rows, seed=0):
+    """Synthetic Clean Live Data sheet (all values are strings, like a Sheets download)"""
+    rng = np.random.default_rng(seed)
+
+    def pick(values):
+        return rng.choice(values, n_rows)
+
+    def ratings():
+        return rng.integers(1, 11, n_rows).astype(str)
+
+    return pd.DataFrame({
+        "Submission ID": [f"id{i}" for i in range(n_rows)],
+        "Name": [f"Runner {i}" for i in range(n_rows)],
+        "Foot Width": pick(["Narrow", "Regular", "Wide"]),
+        "Trainer Model": pick(["Nike Pegasus 40", "Hoka Clifton 9", "ASICS Novablast 4", "Brooks Ghost 15"]),
+        "Run Type": pick(["Long run", "Easy run", "Tempo", "Race"]),
+        "Total Distance": rng.integers(10, 800, n_rows).astype(str),
+        "Terrain": pick(["Road", "Trail", "Track", "Mixed"]),
+        "Pain Experienced": pick(["No pain", "knee pain", "Heel pain", "none", "blisters"]),
+        COMFORT_COL_ALT: ratings(),
+        CUSHIONING_COL_ALT: ratings(),
+        RESPONSIVENESS_COL_ALT: ratings(),
+        "Average 5k Time": pick(["sub 20", "sub 25", "sub 30", "sub 35", "sub 40"]),
+        "Weight": pick(["Under 65kg", "Between 65kg - 85kg", "Over 85kg"]),
+        "Score": ratings(),
+    })
+
+
+@pytest.fixture(autouse=True)
+def recommendation_table_file(tmp_path, monkeypatch):
+    """A private recommendation table (served table, file path and file bookkeeping) for each test"""
+    from analysis import recommendation_table
+
+    path = str(tmp_path / "recommendation_table.json")
+    monkeypatch.setattr(recommendation_table, "RECOMMENDATION_TABLE_FILE", path)
+    monkeypatch.setattr(recommendation_table, "_table", {"version": None, "entries": {}})
+    monkeypatch.setattr(recommendation_table, "_building_versions", set())
+    monkeypatch.setattr(recommendation_table, "_loaded_file_mtimes", {})
+    return path
+
+
+@pytest.fixture
+def reviews(monkeypatch):
+    df = make_reviews(20000)
+    monkeypatch.setattr(snapshot_cache, "ttl", float("inf"))
+    snapshot_cache.put(SHEET_CLEAN_DATA, df)
+    yield df
+    snapshot_cache.invalidate(SHEET_CLEAN_DATA)
+
+
+def test_relaxed_tiers_pick_first_non_empty(reviews):
+    # No review is on sand, so every tier that keeps the terrain filter is empty
+    result = get_recommendations("First 5k", "Long run", "Sand", "Regular", "Over 85kg", "knee")
+
+    assert result.attrs["strategy_used"] == "relaxed_all_except_pain"
+    assert result["Num_Reviews"].sum() == (~reviews["Pain Experienced"].str.lower().str.contains("knee")).sum()
+
+
+def test_recommendation_peak_allocation(reviews):
+    kwargs = dict(run_goal="First 5k", run_type="Long run", terrain="Sand", foot_width="Regular",
+                  weight="Over 85kg", pain="knee")
+    # Warm up so the per-snapshot index isn't counted against the request
+    get_recommendations(**kwargs)
+
+    tracemalloc.start()
+    try:
+        get_recommendations(**kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # A request that falls through every tier must cost less than two shallow copies of the review table
+    full_frame_copy = reviews.shape[0] * reviews.shape[1] * 8
+    assert peak < 2 * full_frame_copy
+
+
+def test_batch_matches_single_requests(reviews):
+    profiles = [
+        normalize_request(*params)
+        for params in [
+            ("First 5k", "Long run", "Sand", "Regular", "Over 85kg", "knee"),
+            ("Speed/Tempo", "Tempo", "Track", "", "Under 65kg", ""),
+            ("Comfy/Long Run", "Easy run", "Road", "Wide", "", "no pain"),
+            ("Beginner/Walk", "Race", "Trail", "Narrow", "Between 65kg - 85kg", "heel"),
+            ("Speed/Tempo", "Tempo", "Track", "", "Under 65kg", ""),
+        ]
+    ]
+    snapshot = snapshot_cache.get(SHEET_CLEAN_DATA, None)
+
+    batch = list(iter_batch_recommendations(profiles, snapshot, chunk_cells=2 * len(reviews)))
+
+    assert dumps(batch) == dumps([
+        recommendations_payload(get_recommendations(*params, snapshot=snapshot, verbose=False))
+        for params in profiles
+    ])
+
+
+def test_batch_reports_invalid_patterns_per_profile(reviews):
+    valid = normalize_request("Speed/Tempo", "Tempo", "Track", "", "Under 65kg", "knee")
+    invalid = normalize_request("Speed/Tempo", "Tempo", "Track", "", "Under 65kg", "xyz(")
+    snapshot = snapshot_cache.get(SHEET_CLEAN_DATA, None)
+
+    batch = list(iter_batch_recommendations([valid, invalid, valid], snapshot))
+
+    expected = recommendations_payload(get_recommendations(*valid, snapshot=snapshot, verbose=False))
+    assert dumps(batch[0]) == dumps(batch[2]) == dumps(expected)
+    assert list(batch[1]) == ["error"]
+
+
+def test_table_saved_after_first_check_is_loaded(reviews):
+    from analysis.recommendation_table import ensure_recommendation_table, lookup_recommendations, save_recommendation_table
+
+    snapshot = snapshot_cache.get(SHEET_CLEAN_DATA, None)
+    params = normalize_request("Speed/Tempo", "Tempo", "Track", "", "", "")
+    payload = {"success": True, "data": []}
+
+    # The API sees the new data before main.py has saved its table
+    ensure_recommendation_table(snapshot)
+    assert lookup_recommendations(params, snapshot.version) is None
+
+    save_recommendation_table({"version": snapshot.version, "entries": {params: payload}})
+    ensure_recommendation_table(snapshot)
+    assert lookup_recommendations(params, snapshot.version) == payload
+
+
+def test_table_saved_before_snapshot_refresh_is_loaded(reviews):
+    from analysis.recommendation_table import ensure_recommendation_table, lookup_recommendations, save_recommendation_table
+
+    old_snapshot = snapshot_cache.get(SHEET_CLEAN_DATA, None)
+    new_snapshot = snapshot_cache.put(SHEET_CLEAN_DATA, reviews.iloc[:-1])
+    params = normalize_request("Speed/Tempo", "Tempo", "Track", "", "", "")
+    payload = {"success": True, "data": []}
+
+    # main.py saves the table for the new data while the API is still on the old snapshot
+    save_recommendation_table({"version": new_snapshot.version, "entries": {params: payload}})
+    ensure_recommendation_table(old_snapshot)
+    assert lookup_recommendations(params, old_snapshot.version) is None
+
+    ensure_recommendation_table(new_snapshot)
+    assert lookup_recommendations(params, new_snapshot.version) == payload
+
+
+def test_limit_offset_returns_page_of_full_ranking(reviews):
+    full = get_recommendations("Speed/Tempo", "Tempo", "Track", "", "", "")
+
+    page = get_recommendations("Speed/Tempo", "Tempo", "Track", "", "", "", limit=2, offset=1)
+
+    assert page["Trainer Model"].tolist() == full["Trainer Model"].tolist()[1:3]
+    assert page.attrs["total"] == len(full)
+
+
+def test_analysis_response_is_computed_from_the_cached_snapshot(reviews, monkeypatch):
+    import asyncio
+
+    import api
+    from services.result_cache import ResultCache
+
+    snapshot = snapshot_cache.get(SHEET_CLEAN_DATA, None)
+
+    class SnapshotOnly:
+        async def aget_snapshot(self, sheet_name):
+            return snapshot
+
+        def read_to_dataframe(self, sheet_name, use_cache=True):
+            raise AssertionError("the analysis re-read the sheet")
+
+    monkeypatch.setattr(api, "analysis_cache", ResultCache(2, 60))
+    body = asyncio.run(api._analysis_response("leaderboard", SnapshotOnly()))
+
+    assert api.analysis_cache.get("leaderboard", snapshot.version) == body
+    assert loads(body)["success"]
+
+
+def test_ready_once_warm_up_has_built_caches(reviews):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    with TestClient(api.app) as client:
+        deadline = time.monotonic() + 30
+        while client.get("/ready").status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert client.get("/ready").json()["status"] == "ready"
+
+        # The leaderboard was computed during warm-up, so the request is served from the cache
+        hits = api.analysis_cache.hits
+        assert client.get("/leaderboard").json()["success"]
+        assert api.analysis_cache.hits == hits + 1
@@ -0,0 +1,38 @@
+from services.result_cache import ResultCache
+
+
+def test_new_data_version_clears_cached_responses():
+    cache = ResultCache(max_entries=10, ttl=60)
+    cache.set("leaderboard", "v1", b"old")
+    assert cache.get("leaderboard", "v1") == b"old"
+
+    assert cache.get("leaderboard", "v2") is None
+    # A response computed from the replaced data arriving late isn't stored
+    cache.set("leaderboard", "v1", b"late")
+    assert cache.get("leaderboard", "v2") is None
+
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["data_version"] == "v2"
+    assert stats["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.set("a", "v1", 1)
+    cache.set("b", "v1", 2)
+    cache.get("a", "v1")
+    cache.set("c", "v1", 3)
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == 1
+    assert cache.get("c", "v1") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_are_misses():
+    cache = ResultCache(max_entries=2, ttl=0)
+    cache.set("a", "v1", 1)
+
+    assert cache.get("a", "v1") is None
+    assert cache.stats()["misses"] == 1
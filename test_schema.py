@@ -0,0 +1,51 @@
+import pandas as pd
+
+from analysis.schema import COMFORT_COL_ALT, TRAINER_MODEL_COL_ALT, resolve_schema, schema_for
+from analysis.usage_patterns import analyze_usage_patterns
+
+
+def test_clean_headers_resolve_exactly():
+    schema = resolve_schema(["Submission ID", "Trainer Model", "Run Type", "Comfort", "Total Distance", "Name"])
+    assert schema["submission_id"] == "Submission ID"
+    assert schema["trainer"] == "Trainer Model"
+    assert schema["run_type"] == "Run Type"
+    assert schema["comfort"] == "Comfort"
+    assert schema["distance"] == "Total Distance"
+    assert schema["name"] == "Name"
+    assert schema["terrain"] is None
+
+
+def test_raw_tally_headers_resolve():
+    headers = [
+        TRAINER_MODEL_COL_ALT,
+        COMFORT_COL_ALT,
+        "What type of run do you mostly use them for?",
+        "What shall we call you?\n",
+        "Distance in Trainers (km)",
+        "Did you experience any pain or discomfort?",
+    ]
+    schema = resolve_schema(headers)
+    assert schema["trainer"] == TRAINER_MODEL_COL_ALT
+    assert schema["comfort"] == COMFORT_COL_ALT
+    assert schema["run_type"] == "What type of run do you mostly use them for?"
+    assert schema["name"] == "What shall we call you?\n"
+    assert schema["distance"] == "Distance in Trainers (km)"
+    assert schema["pain"] == "Did you experience any pain or discomfort?"
+
+
+def test_schema_is_resolved_once_per_header_row():
+    first = pd.DataFrame({"Trainer Model": ["A"], "Score": [5]})
+    second = pd.DataFrame({"Trainer Model": ["B", "C"], "Score": [1, 2]})
+    assert schema_for(first) is schema_for(second)
+    assert schema_for(first) is not schema_for(first.rename(columns={"Score": "Other"}))
+
+
+def test_usage_patterns_use_cleaned_distance_column():
+    df = pd.DataFrame({
+        "Trainer Model": ["A", "A", "B"],
+        "Total Distance": ["10", "20", "5"],
+        "Name": ["x", "y", "z"],
+    })
+    usage = analyze_usage_patterns(write=False, df=df).set_index("Trainer Model")
+    assert usage.loc["A", "Avg_Distance"] == 15
+    assert usage.loc["A", "Respondents"] == 2
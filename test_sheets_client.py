@@ -0,0 +1,43 @@
+import threading
+
+from services.sheets_client import SheetsClientManager
+
+
+class FakeCredentials:
+    valid = True
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.opened = []
+
+    def worksheet(self, sheet_name):
+        self.opened.append(sheet_name)
+        return object()
+
+
+def test_credentials_are_loaded_once_for_every_thread(monkeypatch):
+    manager = SheetsClientManager()
+    loads = []
+    monkeypatch.setattr(manager, "_load_credentials", lambda: loads.append(1) or FakeCredentials())
+
+    threads = [threading.Thread(target=manager.get_credentials) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+
+
+def test_worksheet_handles_are_shared_until_forgotten():
+    manager = SheetsClientManager()
+    spreadsheet = manager._spreadsheet = FakeSpreadsheet()
+
+    first = manager.get_worksheet("Clean Live Data")
+    assert manager.get_worksheet("Clean Live Data") is first
+    assert spreadsheet.opened == ["Clean Live Data"]
+
+    manager.forget_worksheet("Clean Live Data")
+    assert manager.get_worksheet("Clean Live Data") is not first
+    assert spreadsheet.opened == ["Clean Live Data", "Clean Live Data"]
@@ -0,0 +1,82 @@
+from services.sheets_service import SheetsService, changed_blocks
+
+
+def apply_blocks(current, blocks):
+    grid = [list(row) for row in current]
+    for row, col, values in blocks:
+        for i, block_row in enumerate(values):
+            while len(grid) < row + i:
+                grid.append([])
+            target = grid[row + i - 1]
+            target.extend([""] * (col - 1 + len(block_row) - len(target)))
+            target[col - 1:col - 1 + len(block_row)] = block_row
+    return grid
+
+
+def trimmed(grid):
+    rows = [list(row) for row in grid]
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def test_changed_blocks_turn_current_values_into_rows():
+    current = [["Trainer", "Score"], ["A", 5], ["B", 3], ["C", True], ["D", 1, "old"]]
+    rows = [["Trainer", "Score"], ["A", 5.0], ["B", 4], ["C", 1], ["E", ""]]
+    blocks = changed_blocks(current, rows)
+    # 5 -> 5.0 is no change; rows 3-5 changed (TRUE -> 1 included), so one block from A3 to the stale "old" in C5
+    assert [(row, col) for row, col, _ in blocks] == [(3, 1)]
+    assert trimmed(apply_blocks(current, blocks)) == trimmed(rows)
+
+
+def test_unchanged_sheet_needs_no_writes():
+    rows = [["Trainer", "Score"], ["A", 5]]
+    assert changed_blocks([list(row) for row in rows], rows) == []
+
+
+def test_shorter_table_blanks_the_rows_left_behind():
+    current = [["Trainer"], ["A"], ["B"], ["C"]]
+    rows = [["Trainer"], ["A"]]
+    assert changed_blocks(current, rows) == [(3, 1, [[""], [""]])]
+
+
+class FakeWorksheet:
+    """Worksheet handle over a shared grid; like gspread's, it keeps the row count it was opened with"""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.row_count = len(grid)
+
+    def batch_get(self, ranges):
+        results = []
+        for a1_range in ranges:
+            first, last = (int(row) for row in a1_range.split(":"))
+            results.append([list(row) for row in self.grid[first - 1:min(last, self.row_count)]])
+        return results
+
+
+class FakeManager:
+    def __init__(self, grid):
+        self.grid = grid
+        self.handles = {}
+
+    def get_worksheet(self, sheet_name):
+        return self.handles.setdefault(sheet_name, FakeWorksheet(self.grid))
+
+    def forget_worksheet(self, sheet_name):
+        self.handles.pop(sheet_name, None)
+
+
+def test_read_rows_sees_rows_added_after_the_handle_was_opened():
+    grid = [["Submission ID", "Score"], ["id0", "5"], ["id1", "7"]]
+    sheets = SheetsService(manager=FakeManager(grid))
+    assert sheets.read_rows("rawdata", 2) == (["Submission ID", "Score"], [["id1", "7"]])
+
+    # Another process appends two submissions
+    grid.extend([["id2", "6"], ["id3"]])
+
+    assert sheets.read_rows("rawdata", 2) == (["Submission ID", "Score"], [["id1", "7"], ["id2", "6"], ["id3", ""]])
+    assert sheets.read_rows("rawdata", 5) == (["Submission ID", "Score"], [])
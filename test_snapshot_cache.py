@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pandas as pd
+
+from services.snapshot_cache import SnapshotCache
+
+SHEET = "Cache Test"
+
+
+class BlockingFetch:
+    """A sheet download that counts its calls and, once `hold()` is called, waits until `release()`"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def hold(self):
+        self.gate.clear()
+
+    def release(self):
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        assert self.gate.wait(5), "fetch was never released"
+        return pd.DataFrame({"Trainer Model": ["Hoka Clifton 9"], "Score": [str(self.calls)]})
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_stale_snapshot_is_served_while_refreshing():
+    cache, fetch = SnapshotCache(ttl=60), BlockingFetch()
+    stale = cache.get(SHEET, fetch)
+    cache.ttl = 0
+    fetch.hold()
+
+    # The refresh is blocked, yet readers get the stale snapshot straight away (and start one refresh only)
+    assert cache.get(SHEET, fetch) is stale
+    assert cache.get(SHEET, fetch) is stale
+    wait_for(lambda: fetch.calls == 2)
+    fetch.release()
+    wait_for(lambda: not cache._refreshing)
+
+    cache.ttl = 60
+    fresh = cache.get(SHEET, fetch)
+    assert fresh is not stale
+    assert fresh.df["Score"].tolist() == ["2"]
+    assert fetch.calls == 2
+
+
+def test_unchanged_download_keeps_the_snapshot():
+    cache = SnapshotCache(ttl=60)
+    frame = pd.DataFrame({"Trainer Model": ["Hoka Clifton 9"], "Score": ["8"]})
+    snapshot = cache.put(SHEET, frame)
+
+    assert cache.put(SHEET, frame.copy()) is snapshot
+    changed = cache.put(SHEET, frame.assign(Score=["9"]))
+    assert changed is not snapshot
+    assert changed.version != snapshot.version
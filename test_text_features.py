@@ -0,0 +1,37 @@
+import pandas as pd
+
+from analysis import text_features
+from analysis.text_features import TextFeatureStore, get_text_features, text_hash
+
+
+def features_of(text):
+    tokens = tuple(text.lower().split())
+    return tokens, tokens, 0.5, 0.25
+
+
+def test_store_loads_only_the_requested_texts(tmp_path):
+    store = TextFeatureStore(str(tmp_path / "features.sqlite"))
+    texts = ["Great cushioning", "Too narrow", "Blisters after 10k"]
+    store.save(((f"id{i}", "More Information", text_hash(text)), features_of(text)) for i, text in enumerate(texts))
+
+    keys, features = store.load(["More Information"], [text_hash("Too narrow"), text_hash("never stored")])
+
+    assert keys == {("id1", "More Information", text_hash("Too narrow"))}
+    assert features == {text_hash("Too narrow"): features_of("Too narrow")}
+
+
+def test_stored_answers_are_not_recomputed(tmp_path, monkeypatch):
+    store = TextFeatureStore(str(tmp_path / "features.sqlite"))
+    df = pd.DataFrame({"Submission ID": ["id0", "id1"], "More Information": ["Great cushioning", "Too narrow"]})
+    store.save(
+        ((submission_id, "More Information", text_hash(text)), features_of(text))
+        for submission_id, text in zip(df["Submission ID"], df["More Information"])
+    )
+
+    def compute_features(texts):
+        raise AssertionError(f"recomputed {texts}")
+
+    monkeypatch.setattr(text_features, "compute_features", compute_features)
+    result = get_text_features(df, [("More Information", "More Information")], store=store)
+
+    assert result["More Information"]["tokens"].tolist() == [("great", "cushioning"), ("too", "narrow")]
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from analysis.leaderboard import create_leaderboard
+from analysis.recommendations import run_goal_mask
+from analysis.typed_frame import parse_5k_column, to_typed_frame
+from analysis.usage_patterns import analyze_usage_patterns
+from config.settings import SHEET_CLEAN_DATA
+from services.snapshot_cache import SnapshotCache
+
+
+def clean_frame():
+    return pd.DataFrame({
+        "Name": ["Ana", "Ben", "Cy", "Di"],
+        "Trainer Model": ["Hoka Clifton 9", "Hoka Clifton 9", "Brooks Ghost 15", "Brooks Ghost 15"],
+        "Terrain": ["Road", "Trail", "Road", None],
+        "Comfort Rating": ["8", "7", "x", "9"],
+        "Score": ["7.3", "7.3", "5.2", ""],
+        "Total Distance": ["123.4", "200", "", "80.1"],
+        "Average 5k Time": ["sub 30", "Sub 33", "40 minutes", None],
+    })
+
+
+def test_typed_frame_types():
+    typed = to_typed_frame(clean_frame())
+
+    assert isinstance(typed["Trainer Model"].dtype, pd.CategoricalDtype)
+    assert typed["Trainer Model"].tolist() == clean_frame()["Trainer Model"].tolist()
+    assert typed["Comfort Rating"].dtype == np.float32
+    assert typed["Score"].tolist()[:3] == [7.3, 7.3, 5.2]
+    assert typed["Total Distance"].tolist()[0] == 123.4
+
+
+def test_clean_live_data_snapshots_are_typed():
+    snapshot = SnapshotCache().put(SHEET_CLEAN_DATA, clean_frame())
+
+    assert isinstance(snapshot.df["Trainer Model"].dtype, pd.CategoricalDtype)
+    assert snapshot.df["5k Bucket"].tolist() == [30, 33, 0, 0]
+
+
+def test_parse_5k_answers():
+    minutes, bucket = parse_5k_column(pd.Series(["sub 30", "Sub33", "40 minutes", "45 mins", "fast", None]))
+
+    np.testing.assert_array_equal(minutes, np.array([30, 33, 40, 45, np.nan, np.nan], dtype=np.float32))
+    assert bucket.tolist() == [30, 33, 0, 0, 0, 0]
+
+
+def test_5k_goal_bonus_only_for_listed_buckets():
+    answers = pd.Series(["sub 30", "sub30", "Sub 33", "sub 35", "sub 40", "sub 45", "30 minutes", None])
+    arrays = {"five_k_bucket": parse_5k_column(answers)[1]}
+
+    assert run_goal_mask("first 5k", None, arrays).tolist() == [True, True, False, True, True, False, False, False]
+    assert run_goal_mask("beginner/walk", None, arrays).tolist() == [False, False, False, True, True, False, False, False]
+
+
+def test_analyses_of_typed_frame_match_plain_frame():
+    plain, typed = clean_frame(), to_typed_frame(clean_frame())
+    plain["Score"] = pd.to_numeric(plain["Score"], errors="coerce")
+    plain["Total Distance"] = pd.to_numeric(plain["Total Distance"], errors="coerce")
+
+    for analyze in (create_leaderboard, analyze_usage_patterns):
+        expected = analyze(write=False, df=plain)
+        result = analyze(write=False, df=typed)
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False, check_exact=True)
+    assert create_leaderboard(write=False, df=typed)["Avg_Score"].tolist()[0] == 7.3